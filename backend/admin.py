@@ -0,0 +1,297 @@
+"""
+/api/admin routes. server.py mounts this app lazily, so a cold start that
+serves only storefront traffic never imports or builds these routes.
+"""
+import csv
+import io
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Union
+
+import orjson
+from fastapi import Depends, FastAPI, File, HTTPException, Query, UploadFile
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+from server import (
+    ORDERS_MAX_LIMIT, Order, OrderSummary, catalog_cache, db, get_admin_user, list_orders, parse_iso_datetime
+)
+
+
+# Admin exports stream straight from a Motor cursor in batches
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+EXPORT_COLUMNS = {
+    "products": ["id", "name", "description", "price", "category", "brand", "images", "stock", "rating", "review_count", "created_at"],
+    "orders": ["id", "user_id", "created_at", "status", "payment_status", "subtotal", "discount", "total", "items", "shipping_address"],
+}
+
+admin_app = FastAPI(default_response_class=ORJSONResponse)
+
+
+class OrderStatusBulkUpdate(BaseModel):
+    order_ids: List[str]
+    status: str
+
+
+class TopProduct(BaseModel):
+    product_id: str
+    name: str
+    quantity: int
+    revenue: float
+
+
+class DailyMetrics(BaseModel):
+    day: str
+    order_count: int
+    revenue: float
+
+
+class DashboardMetrics(BaseModel):
+    start: str
+    end: str
+    order_count: int
+    revenue: float
+    discount: float
+    items_sold: int
+    average_order_value: float
+    daily: List[DailyMetrics]
+    top_products: List[TopProduct]
+
+
+@admin_app.get("/orders", response_model=Union[List[Order], List[OrderSummary]])
+async def admin_get_orders(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=ORDERS_MAX_LIMIT),
+    status: Optional[str] = None,
+    payment_status: Optional[str] = None,
+    user_id: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    view: str = "summary",
+    admin_user: dict = Depends(get_admin_user)
+):
+    """Orders across all customers, newest first, with indexed filters"""
+    query = {}
+    if payment_status:
+        query["payment_status"] = payment_status
+    if user_id:
+        query["user_id"] = user_id
+    return await list_orders(query, cursor, limit, status, created_from, created_to, view)
+
+
+@admin_app.put("/orders/status")
+async def admin_update_order_status(update: OrderStatusBulkUpdate, admin_user: dict = Depends(get_admin_user)):
+    result = await db.orders.update_many({"id": {"$in": update.order_ids}}, {"$set": {"status": update.status}})
+    return {"message": "Order status updated", "matched": result.matched_count, "modified": result.modified_count}
+
+
+def metrics_range(start: Optional[str], end: Optional[str]):
+    """Inclusive YYYY-MM-DD day range; defaults to the last 30 days"""
+    today = datetime.now(timezone.utc).date()
+    try:
+        end_day = datetime.strptime(end, "%Y-%m-%d").date() if end else today
+        start_day = datetime.strptime(start, "%Y-%m-%d").date() if start else end_day - timedelta(days=29)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start and end must be YYYY-MM-DD")
+    if start_day > end_day:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    return start_day.isoformat(), end_day.isoformat()
+
+
+async def rebuild_daily_metrics(start: str, end: str, target_db=None):
+    """Recompute rollups for [start, end] from the orders collection"""
+    target_db = db if target_db is None else target_db
+    match = {"$match": {"created_at": {
+        "$gte": start, "$lt": (datetime.fromisoformat(end) + timedelta(days=1)).date().isoformat()
+    }}}
+    day = {"$substrCP": ["$created_at", 0, 10]}
+    await target_db.order_daily_metrics.delete_many({"_id": {"$gte": start, "$lte": end}})
+    await target_db.orders.aggregate([
+        match,
+        {"$group": {
+            "_id": day,
+            "order_count": {"$sum": 1},
+            "revenue": {"$sum": "$total"},
+            "discount": {"$sum": "$discount"},
+            "items_sold": {"$sum": {"$sum": "$items.quantity"}}
+        }},
+        {"$merge": {"into": "order_daily_metrics", "whenMatched": "merge", "whenNotMatched": "insert"}}
+    ]).to_list(None)
+    await target_db.orders.aggregate([
+        match,
+        {"$unwind": "$items"},
+        {"$group": {
+            "_id": {"day": day, "product_id": "$items.product_id"},
+            "name": {"$last": "$items.product_name"},
+            "quantity": {"$sum": "$items.quantity"},
+            "revenue": {"$sum": {"$multiply": ["$items.price", "$items.quantity"]}}
+        }},
+        {"$group": {
+            "_id": "$_id.day",
+            "products": {"$push": {"k": "$_id.product_id", "v": {"name": "$name", "quantity": "$quantity", "revenue": "$revenue"}}}
+        }},
+        {"$project": {"products": {"$arrayToObject": "$products"}}},
+        {"$merge": {"into": "order_daily_metrics", "whenMatched": "merge", "whenNotMatched": "insert"}}
+    ]).to_list(None)
+
+
+async def rebuild_all_daily_metrics(target_db=None):
+    """
+    Rebuild the rollups for every day that has orders and drop rollups for
+    days that no longer do. Returns the (start, end) days rebuilt, or None
+    when there are no orders.
+    """
+    target_db = db if target_db is None else target_db
+    first = await target_db.orders.find_one({}, {"_id": 0, "created_at": 1}, sort=[("created_at", 1)])
+    if not first:
+        await target_db.order_daily_metrics.delete_many({})
+        return None
+    last = await target_db.orders.find_one({}, {"_id": 0, "created_at": 1}, sort=[("created_at", -1)])
+    start, end = first["created_at"][:10], last["created_at"][:10]
+    await target_db.order_daily_metrics.delete_many({"$or": [{"_id": {"$lt": start}}, {"_id": {"$gt": end}}]})
+    await rebuild_daily_metrics(start, end, target_db)
+    return start, end
+
+
+@admin_app.get("/metrics", response_model=DashboardMetrics)
+async def admin_get_metrics(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    top: int = Query(10, ge=1, le=100),
+    admin_user: dict = Depends(get_admin_user)
+):
+    """
+    Revenue, order counts and top products from the daily rollups, so the
+    cost depends on the number of days, not the number of orders.
+    """
+    start, end = metrics_range(start, end)
+    days = await db.order_daily_metrics.find({"_id": {"$gte": start, "$lte": end}}).sort("_id", 1).to_list(None)
+    
+    products = {}
+    for d in days:
+        for product_id, p in (d.get("products") or {}).items():
+            total = products.setdefault(product_id, {"product_id": product_id, "name": p.get("name", ""), "quantity": 0, "revenue": 0.0})
+            total["quantity"] += p.get("quantity", 0)
+            total["revenue"] += p.get("revenue", 0.0)
+    top_products = sorted(products.values(), key=lambda p: p["revenue"], reverse=True)[:top]
+    
+    order_count = sum(d.get("order_count", 0) for d in days)
+    revenue = round(sum(d.get("revenue", 0.0) for d in days), 2)
+    return DashboardMetrics(
+        start=start,
+        end=end,
+        order_count=order_count,
+        revenue=revenue,
+        discount=round(sum(d.get("discount", 0.0) for d in days), 2),
+        items_sold=sum(d.get("items_sold", 0) for d in days),
+        average_order_value=round(revenue / order_count, 2) if order_count else 0.0,
+        daily=[DailyMetrics(day=d["_id"], order_count=d.get("order_count", 0), revenue=round(d.get("revenue", 0.0), 2)) for d in days],
+        top_products=[TopProduct(**{**p, "revenue": round(p["revenue"], 2)}) for p in top_products]
+    )
+
+
+@admin_app.post("/metrics/rebuild")
+async def admin_rebuild_metrics(start: Optional[str] = None, end: Optional[str] = None, admin_user: dict = Depends(get_admin_user)):
+    start, end = metrics_range(start, end)
+    await rebuild_daily_metrics(start, end)
+    return {"message": "Metrics rebuilt", "start": start, "end": end}
+
+
+@admin_app.post("/products/import")
+async def admin_import_products(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    admin_user: dict = Depends(get_admin_user)
+):
+    """
+    Upsert products from an uploaded CSV or NDJSON file, keyed on id.
+    The upload is spooled to disk and parsed in batches on the threadpool,
+    so memory stays flat and the event loop never blocks on file reads.
+    """
+    # Imported lazily: only this route needs it
+    from product_import import detect_format, import_products, read_rows, rows_in_threadpool
+    
+    fmt = format or detect_format(file.filename)
+    lines = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        report = await import_products(
+            rows_in_threadpool(read_rows(lines, fmt)), on_chunk=lambda ids: catalog_cache.invalidate(*ids)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return report
+
+
+def export_csv_value(value):
+    # images use the same "|" form product_import accepts; other nesting is JSON
+    if isinstance(value, list) and all(isinstance(v, str) for v in value):
+        return "|".join(value)
+    if isinstance(value, (list, dict)):
+        return orjson.dumps(value).decode()
+    return value
+
+
+async def export_stream(collection: str, query: dict, fmt: str, batch_size: int):
+    """Yield NDJSON or CSV in batch-sized pieces; memory is bounded by one batch"""
+    columns = EXPORT_COLUMNS[collection]
+    projection = {"_id": 0, **{c: 1 for c in columns}}
+    cursor = db[collection].find(query, projection).sort("id", 1).batch_size(batch_size)
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(columns)
+    chunk = [buffer.getvalue().encode()] if fmt == "csv" else []
+    buffer.seek(0)
+    buffer.truncate()
+    
+    async for doc in cursor:
+        if fmt == "csv":
+            writer.writerow([export_csv_value(doc.get(c)) for c in columns])
+            chunk.append(buffer.getvalue().encode())
+            buffer.seek(0)
+            buffer.truncate()
+        else:
+            chunk.append(orjson.dumps(doc) + b"\n")
+        if len(chunk) >= batch_size:
+            yield b"".join(chunk)
+            chunk.clear()
+    if chunk:
+        yield b"".join(chunk)
+
+
+@admin_app.get("/export/{collection}")
+async def admin_export(
+    collection: str,
+    format: str = "ndjson",
+    batch_size: int = Query(EXPORT_BATCH_SIZE, ge=1, le=10000),
+    cursor: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    admin_user: dict = Depends(get_admin_user)
+):
+    """
+    Stream every product or order ordered by id. To resume an interrupted
+    export, pass the id of the last row received as cursor.
+    """
+    if collection not in EXPORT_COLUMNS:
+        raise HTTPException(status_code=404, detail=f"Unknown export: {collection}")
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    
+    query = {}
+    if cursor:
+        query["id"] = {"$gt": cursor}
+    if created_from or created_to:
+        query["created_at"] = {}
+        if created_from:
+            query["created_at"]["$gte"] = parse_iso_datetime(created_from, "created_from")
+        if created_to:
+            query["created_at"]["$lt"] = parse_iso_datetime(created_to, "created_to")
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_stream(collection, query, format, batch_size),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{collection}.{format}"'}
+    )
@@ -0,0 +1,128 @@
+"""
+Cold-start cost of the Vercel entry point (server.py, per vercel.json).
+
+Each run is a fresh interpreter that imports server with VERCEL set, the way
+a new serverless instance does (so LAZY_INIT defaults on as in production). The script reports the median import time, the
+median process wall time and the number of modules loaded. --ref measures
+another git revision the same way (checked out into a temporary worktree)
+for a before/after comparison. --top lists the slowest imports from
+python -X importtime (modules server.py imports directly).
+
+    python benchmarks/cold_start.py --runs 15
+    python benchmarks/cold_start.py --ref HEAD~1 --top 15
+
+No database is contacted: importing the app must not need one.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import server
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "import_s": elapsed,
+    "modules": len(sys.modules),
+    "ok": hasattr(server, "app"),
+}))
+"""
+
+
+def probe_env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    env.setdefault("DB_NAME", "benchmark")
+    # Vercel sets this on every deployment; server.py derives LAZY_INIT from it
+    env.setdefault("VERCEL", "1")
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def measure(backend_dir: Path, runs: int) -> dict:
+    env = probe_env()
+    # Warm the bytecode cache so runs measure imports, not compilation
+    subprocess.run([sys.executable, "-c", PROBE], cwd=backend_dir, env=env, capture_output=True)
+
+    imports, walls, modules = [], [], 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", PROBE], cwd=backend_dir, env=env, capture_output=True, text=True)
+        walls.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            raise SystemExit(f"import failed in {backend_dir}:\n{result.stderr}")
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        if not sample["ok"]:
+            raise SystemExit(f"server.py imported without an app in {backend_dir}:\n{result.stderr}")
+        imports.append(sample["import_s"])
+        modules = sample["modules"]
+    return {
+        "import_ms": round(statistics.median(imports) * 1000, 1),
+        "process_ms": round(statistics.median(walls) * 1000, 1),
+        "modules": modules,
+    }
+
+
+def slowest_imports(backend_dir: Path, top: int) -> list:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=backend_dir, env=probe_env(), capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        # server is depth 0; depth 1 is what it imports
+        if depth == 1:
+            rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--ref", help="git revision to compare against")
+    parser.add_argument("--top", type=int, default=0, help="list the N slowest top-level imports")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    results = {"current": measure(BACKEND_DIR, args.runs)}
+    if args.ref:
+        repo = Path(subprocess.run(
+            ["git", "rev-parse", "--show-toplevel"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip())
+        with tempfile.TemporaryDirectory() as tmp:
+            worktree = Path(tmp) / "ref"
+            subprocess.run(["git", "worktree", "add", "--detach", str(worktree), args.ref],
+                           cwd=repo, capture_output=True, check=True)
+            try:
+                results[args.ref] = measure(worktree / BACKEND_DIR.relative_to(repo), args.runs)
+            finally:
+                subprocess.run(["git", "worktree", "remove", "--force", str(worktree)], cwd=repo, capture_output=True)
+
+    print(f"{'tree':<16}{'import ms':>11}{'process ms':>12}{'modules':>9}")
+    for name, r in results.items():
+        print(f"{name:<16}{r['import_ms']:>11.1f}{r['process_ms']:>12.1f}{r['modules']:>9}")
+
+    if args.top:
+        print("\nslowest imports (cumulative ms)")
+        for us, name in slowest_imports(BACKEND_DIR, args.top):
+            print(f"{us / 1000:>9.1f}  {name}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Local stand-in for the two Shopify Customer Account API endpoints server.py
+calls, so benchmarks never touch the network.
+
+    POST /authentication/oauth/token          code "bench-<n>" -> token "bench-token-<n>"
+    POST /account/customer/api/<v>/graphql    token "bench-token-<n>" -> customer <n>
+
+Any other token is rejected with 401. --latency-ms adds a fixed delay to every
+call to model Shopify's round trip.
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from urllib.parse import parse_qs
+
+TOKEN_PREFIX = "bench-token-"
+
+
+def customer(n: int) -> dict:
+    return {
+        "id": f"gid://shopify/Customer/{n}",
+        "displayName": f"Bench User {n}",
+        "emailAddress": {"emailAddress": f"bench{n}@example.com"},
+        "firstName": "Bench",
+        "lastName": f"User {n}",
+    }
+
+
+class FakeShopify:
+    """ASGI app; counts calls so a run can report how often Shopify was hit"""
+
+    def __init__(self, latency_ms: float = 0):
+        self.latency = latency_ms / 1000
+        self.calls = {"token": 0, "customer": 0}
+
+    async def __call__(self, scope, receive, send):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        path = scope["path"]
+        headers = dict(scope["headers"])
+        if path.endswith("/oauth/token"):
+            self.calls["token"] += 1
+            code = parse_qs(body.decode()).get("code", [""])[0]
+            if not code.startswith("bench-"):
+                return await respond(send, 400, {"error": "invalid_grant"})
+            return await respond(send, 200, {
+                "access_token": TOKEN_PREFIX + code.removeprefix("bench-"),
+                "refresh_token": "bench-refresh",
+                "expires_in": 3600,
+                "token_type": "Bearer",
+            })
+        if path.endswith("/graphql"):
+            self.calls["customer"] += 1
+            token = headers.get(b"authorization", b"").decode().removeprefix("Bearer ")
+            if not token.startswith(TOKEN_PREFIX):
+                return await respond(send, 401, {"errors": [{"message": "Unauthorized"}]})
+            return await respond(send, 200, {"data": {"customer": customer(int(token.removeprefix(TOKEN_PREFIX)))}})
+        await respond(send, 404, {"error": "not found"})
+
+
+async def respond(send, status: int, payload: dict):
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def start_in_thread(app: FakeShopify, host: str = "127.0.0.1", port: int = 0):
+    """Serve app with uvicorn on a background thread; returns (server, base_url)"""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    bound_port = server.servers[0].sockets[0].getsockname()[1]
+    return server, f"http://{host}:{bound_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(FakeShopify(args.latency_ms), host="127.0.0.1", port=args.port, lifespan="off")
+
+
+if __name__ == "__main__":
+    main()
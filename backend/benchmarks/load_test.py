@@ -0,0 +1,397 @@
+"""
+Latency and throughput of the hot API paths against a seeded local database.
+
+Boots the FastAPI app in-process (ASGI transport, startup hooks included)
+against a local mongod, or mongomock-motor with --mongomock. The catalog is
+seed_data.py's products scaled up to --products. Shopify login and customer
+lookups go to a local fake (benchmarks/fake_shopify.py). Each scenario
+reports p50/p95/p99 latency and requests per second. Results are written as
+JSON; pass --baseline to compare against an earlier run.
+
+    python benchmarks/load_test.py --products 10000 --orders 50000 --requests 2000
+    python benchmarks/load_test.py --baseline benchmarks/results/before.json --max-regression 10
+
+The database named by --db-name is wiped and reseeded. With --mongomock,
+$text search, $lookup pipelines and transactions are unavailable, so the
+search scenario errors and orders use the compensating path.
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+SCENARIOS = ["products_list", "search", "cart_mutations", "order_create", "discount_apply"]
+INSERT_CHUNK_SIZE = 1000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="benchmark")
+    parser.add_argument("--mongomock", action="store_true", help="use mongomock-motor instead of mongod")
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--orders", type=int, default=5000, help="historical orders seeded before the run")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--auth", choices=["session", "shopify"], default="session",
+                        help="send local session tokens, or Shopify access tokens (customer cache path)")
+    parser.add_argument("--shopify-latency-ms", type=float, default=50)
+    parser.add_argument("--no-catalog-cache", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="defaults to benchmarks/results/load-<timestamp>.json")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument("--max-regression", type=float,
+                        help="exit 1 if any scenario's p95 is this many percent slower than --baseline")
+    return parser.parse_args()
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values) + 0.5))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class ScenarioStats:
+    def __init__(self):
+        self.latencies = []
+        self.status_codes = {}
+        self.errors = 0
+        self.elapsed = 0.0
+
+    def record(self, seconds: float, status: int):
+        self.latencies.append(seconds)
+        self.status_codes[str(status)] = self.status_codes.get(str(status), 0) + 1
+        if status >= 400:
+            self.errors += 1
+
+    def summary(self) -> dict:
+        values = sorted(self.latencies)
+        ms = [v * 1000 for v in values]
+        return {
+            "requests": len(values),
+            "errors": self.errors,
+            "status_codes": self.status_codes,
+            "rps": round(len(values) / self.elapsed, 1) if self.elapsed else 0.0,
+            "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+            "p50_ms": round(percentile(ms, 50), 3),
+            "p95_ms": round(percentile(ms, 95), 3),
+            "p99_ms": round(percentile(ms, 99), 3),
+            "max_ms": round(ms[-1], 3) if ms else 0.0,
+        }
+
+
+class LoadContext:
+    """Shared state for scenario workers: HTTP client, users, catalog sample"""
+
+    def __init__(self, http, users, products, discount_codes, rng):
+        self.http = http
+        self.users = users
+        self.products = products
+        self.discount_codes = discount_codes
+        self.rng = rng
+        self.stats = None
+
+    async def request(self, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        response = await self.http.request(method, url, **kwargs)
+        self.stats.record(time.perf_counter() - start, response.status_code)
+        return response
+
+    def user(self) -> dict:
+        return self.rng.choice(self.users)
+
+    def product(self) -> dict:
+        return self.rng.choice(self.products)
+
+
+# Each scenario issues one logical operation; every HTTP call is timed
+
+async def products_list(ctx: LoadContext):
+    params = {"limit": 24, "sort": ctx.rng.choice(["-created_at", "price", "-rating"]), "fields": "card"}
+    if ctx.rng.random() < 0.5:
+        params["category"] = ctx.product()["category"]
+    await ctx.request("GET", "/api/products", params=params)
+
+
+async def search(ctx: LoadContext):
+    product = ctx.product()
+    term = ctx.rng.choice(product["name"].split() + [product["brand"]])
+    await ctx.request("GET", "/api/products", params={"search": term.lower(), "limit": 24})
+
+
+async def cart_mutations(ctx: LoadContext):
+    user = ctx.user()
+    response = await ctx.request(
+        "POST", "/api/cart", json={"product_id": ctx.product()["id"], "quantity": 1}, headers=user["headers"]
+    )
+    if response.status_code != 200:
+        return
+    cart_id = response.json()["id"]
+    await ctx.request("PUT", f"/api/cart/{cart_id}", json={"quantity": 2}, headers=user["headers"])
+    await ctx.request("DELETE", f"/api/cart/{cart_id}", headers=user["headers"])
+
+
+async def order_create(ctx: LoadContext):
+    user = ctx.user()
+    items = [{"product_id": ctx.product()["id"], "quantity": ctx.rng.randint(1, 3)} for _ in range(ctx.rng.randint(1, 4))]
+    payload = {"items": items, "shipping_address": user["address"]}
+    if ctx.rng.random() < 0.3:
+        payload["discount_code"] = ctx.rng.choice(ctx.discount_codes)
+    await ctx.request("POST", "/api/orders", json=payload, headers=user["headers"])
+
+
+async def discount_apply(ctx: LoadContext):
+    code = ctx.rng.choice(ctx.discount_codes + ["NOTACODE"])
+    await ctx.request("POST", "/api/discount/apply", json={"code": code, "subtotal": round(ctx.rng.uniform(20, 500), 2)})
+
+
+async def run_scenario(ctx: LoadContext, fn, requests: int, concurrency: int) -> dict:
+    ctx.stats = ScenarioStats()
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await fn(ctx)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    ctx.stats.elapsed = time.perf_counter() - start
+    return ctx.stats.summary()
+
+
+def scaled_products(templates: list, count: int, rng: random.Random, product_keywords) -> list:
+    """seed_data.py's products repeated to count, with fresh ids and jittered fields"""
+    now = datetime.now(timezone.utc)
+    products = []
+    for i in range(count):
+        doc = copy.deepcopy(templates[i % len(templates)])
+        batch = i // len(templates)
+        doc["id"] = str(uuid.UUID(int=rng.getrandbits(128)))
+        if batch:
+            doc["name"] = f"{doc['name']} {batch + 1}"
+        doc["price"] = round(doc["price"] * rng.uniform(0.8, 1.2), 2)
+        # Large enough that order_create never runs out of stock
+        doc["stock"] = 10 ** 9
+        doc["review_count"] = rng.randint(0, 500)
+        doc["rating"] = round(rng.uniform(3.0, 5.0), 1)
+        doc["rating_sum"] = doc["rating"] * doc["review_count"]
+        doc["created_at"] = (now - timedelta(minutes=i)).isoformat()
+        doc.pop("reviews", None)
+        doc["search_keywords"] = product_keywords(doc)
+        products.append(doc)
+    return products
+
+
+def bench_address(n: int, rng: random.Random) -> dict:
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "user_id": f"gid://shopify/Customer/{n}",
+        "full_name": f"Bench User {n}",
+        "phone": f"555-{n:04d}",
+        "address_line1": f"{n} Benchmark Ave",
+        "city": "Austin",
+        "state": "TX",
+        "zip_code": "73301",
+        "country": "US",
+        "is_default": True,
+    }
+
+
+def historical_orders(count: int, users: list, products: list, rng: random.Random) -> list:
+    now = datetime.now(timezone.utc)
+    orders = []
+    for i in range(count):
+        user = rng.choice(users)
+        items = []
+        for product in rng.sample(products, k=min(len(products), rng.randint(1, 4))):
+            items.append({
+                "product_id": product["id"], "product_name": product["name"],
+                "product_image": product["images"][0] if product["images"] else "",
+                "price": product["price"], "quantity": rng.randint(1, 3),
+            })
+        subtotal = round(sum(item["price"] * item["quantity"] for item in items), 2)
+        orders.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "user_id": user["id"],
+            "items": items,
+            "subtotal": subtotal,
+            "discount": 0.0,
+            "total": subtotal,
+            "shipping_address": user["address"],
+            "status": rng.choice(["pending", "processing", "shipped", "delivered"]),
+            "payment_status": rng.choice(["pending", "paid"]),
+            "created_at": (now - timedelta(minutes=rng.randint(0, 365 * 24 * 60))).isoformat(),
+        })
+    return orders
+
+
+async def insert_chunked(collection, docs: list):
+    for start in range(0, len(docs), INSERT_CHUNK_SIZE):
+        await collection.insert_many(docs[start:start + INSERT_CHUNK_SIZE], ordered=False)
+
+
+async def seed(server, seed_data, args, rng: random.Random):
+    db = server.db
+    for name in ("products", "reviews", "cart", "orders", "order_daily_metrics", "addresses", "discount_codes"):
+        await db[name].delete_many({})
+
+    products = scaled_products(seed_data.products_data, args.products, rng, server.product_keywords)
+    users = []
+    for n in range(args.users):
+        address = bench_address(n, rng)
+        users.append({"n": n, "id": address["user_id"], "address": address})
+
+    await insert_chunked(db.products, products)
+    await insert_chunked(db.addresses, [dict(u["address"]) for u in users])
+    await insert_chunked(db.orders, historical_orders(args.orders, users, products, rng))
+    await db.discount_codes.insert_many(copy.deepcopy(seed_data.discount_codes))
+    return products, users
+
+
+async def login(http, users: list, mode: str):
+    """Log every user in through /shopify-auth/callback against the fake"""
+    for user in users:
+        response = await http.post("/api/shopify-auth/callback", json={"code": f"bench-{user['n']}", "codeVerifier": "bench"})
+        response.raise_for_status()
+        body = response.json()
+        token = body["session_token"] if mode == "session" and body.get("session_token") else body["access_token"]
+        user["headers"] = {"Authorization": f"Bearer {token}"}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: dict, baseline: dict, max_regression) -> bool:
+    print(f"\n{'vs baseline':<16}{'p50':>10}{'p95':>10}{'p99':>10}{'rps':>10}")
+    ok = True
+    for name, current in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+
+        def delta(key):
+            return (current[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+
+        print(f"{name:<16}{delta('p50_ms'):>+9.1f}%{delta('p95_ms'):>+9.1f}%{delta('p99_ms'):>+9.1f}%{delta('rps'):>+9.1f}%")
+        if max_regression is not None and delta("p95_ms") > max_regression:
+            ok = False
+    return ok
+
+
+async def main():
+    args = parse_args()
+    selected = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(selected) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    from fake_shopify import FakeShopify, start_in_thread
+
+    shopify = FakeShopify(args.shopify_latency_ms)
+    shopify_server, shopify_url = start_in_thread(shopify)
+
+    # server.py reads its configuration at import time
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db_name
+    os.environ["SHOPIFY_ACCOUNT_DOMAIN"] = shopify_url
+    os.environ.setdefault("JWT_SECRET", "benchmark-secret-" + "0" * 32)
+    if args.auth == "session":
+        os.environ.setdefault("LOCAL_SESSIONS", "true")
+    if args.no_catalog_cache:
+        os.environ["CATALOG_CACHE_TTL"] = "0"
+
+    import httpx
+    import seed_data
+    import server
+
+    if args.mongomock:
+        from mongomock_motor import AsyncMongoMockClient
+        server.db = AsyncMongoMockClient()[args.db_name]
+        server.ORDER_TRANSACTIONS = False
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    products, users = await seed(server, seed_data, args, rng)
+    print(f"Seeded {len(products)} products, {len(users)} users, {args.orders} orders "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    await server.app.router.startup()
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "database": "mongomock" if args.mongomock else "mongod",
+            "products": args.products,
+            "users": args.users,
+            "orders": args.orders,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "auth": args.auth,
+            "shopify_latency_ms": args.shopify_latency_ms,
+            "catalog_cache": not args.no_catalog_cache,
+            "seed": args.seed,
+        },
+        "scenarios": {},
+    }
+    try:
+        transport = httpx.ASGITransport(app=server.app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as http:
+            await login(http, users, args.auth)
+            codes = [c["code"] for c in seed_data.discount_codes]
+            ctx = LoadContext(http, users, products, codes, rng)
+            scenario_fns = {fn.__name__: fn for fn in (products_list, search, cart_mutations, order_create, discount_apply)}
+
+            print(f"{'scenario':<16}{'reqs':>7}{'errors':>8}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+            for name in selected:
+                summary = await run_scenario(ctx, scenario_fns[name], args.requests, args.concurrency)
+                results["scenarios"][name] = summary
+                print(f"{name:<16}{summary['requests']:>7}{summary['errors']:>8}{summary['rps']:>9.1f}"
+                      f"{summary['p50_ms']:>9.2f}{summary['p95_ms']:>9.2f}{summary['p99_ms']:>9.2f}")
+        results["meta"]["shopify_calls"] = dict(shopify.calls)
+    finally:
+        await server.app.router.shutdown()
+        shopify_server.should_exit = True
+
+    output = Path(args.output) if args.output else (
+        Path(__file__).resolve().parent / "results" / f"load-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\nResults written to {output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if not compare(results, baseline, args.max_regression):
+            print(f"p95 regressed by more than {args.max_regression}%")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
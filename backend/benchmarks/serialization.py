@@ -0,0 +1,109 @@
+"""
+CPU cost of building a /api/products and /api/orders response body.
+
+Compares the original path (Model(**doc) per document, FastAPI re-validating
+against response_model, stdlib JSON encoding) with the trusted path
+(shape_documents + ORJSONResponse). No database is involved; documents are
+generated in memory so only serialization is measured.
+
+    python benchmarks/serialization.py --products 1000 --orders 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import List
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from server import Order, Product, shape_documents  # noqa: E402
+
+
+def product_doc(i: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "name": f"Product {i}",
+        "description": "Heavy-duty training equipment for home and commercial gyms. " * 3,
+        "price": 19.99 + i,
+        "category": "Gym Equipment",
+        "brand": "PowerFit",
+        "images": [f"https://images.example.com/{i}-{n}.jpg" for n in range(3)],
+        "stock": 25,
+        "rating": 4.5,
+        "rating_sum": 45.0,
+        "review_count": 10,
+        "created_at": "2026-01-01T00:00:00+00:00",
+    }
+
+
+def order_doc(i: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": "gid://shopify/Customer/1",
+        "items": [
+            {"product_id": str(uuid.uuid4()), "product_name": f"Product {n}",
+             "product_image": "https://images.example.com/p.jpg", "price": 49.99, "quantity": 2}
+            for n in range(4)
+        ],
+        "subtotal": 399.92,
+        "discount": 40.0,
+        "total": 359.92,
+        "shipping_address": {
+            "id": str(uuid.uuid4()), "user_id": "gid://shopify/Customer/1", "full_name": "Alex Doe",
+            "phone": "555-0100", "address_line1": "1 Main St", "city": "Austin", "state": "TX",
+            "zip_code": "73301", "country": "US", "is_default": True,
+        },
+        "status": "pending",
+        "payment_status": "pending",
+        "created_at": f"2026-01-{i % 28 + 1:02d}T00:00:00+00:00",
+    }
+
+
+async def original_path(model, docs, field):
+    content = [model(**d) for d in docs]
+    value = await serialize_response(field=field, response_content=content, is_coroutine=True)
+    return JSONResponse(content=value).body
+
+
+async def trusted_path(model, docs, field):
+    return ORJSONResponse(content=shape_documents(model, docs)).body
+
+
+async def measure(fn, model, docs, field, rounds: int) -> float:
+    await fn(model, docs, field)
+    start = time.process_time()
+    for _ in range(rounds):
+        await fn(model, docs, field)
+    return (time.process_time() - start) / rounds * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    cases = [
+        ("/api/products", Product, [product_doc(i) for i in range(args.products)]),
+        ("/api/orders", Order, [order_doc(i) for i in range(args.orders)]),
+    ]
+    print(f"{'route':<16}{'docs':>6}{'original ms':>14}{'trusted ms':>13}{'speedup':>9}")
+    for route, model, docs in cases:
+        field = create_response_field(name=f"Response_{model.__name__}", type_=List[model])
+        before = await measure(original_path, model, docs, field, args.rounds)
+        after = await measure(trusted_path, model, docs, field, args.rounds)
+        print(f"{route:<16}{len(docs):>6}{before:>14.2f}{after:>13.2f}{before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,174 @@
+import asyncio
+import argparse
+import logging
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+
+# Every query pattern in server.py mapped to the index that serves it
+INDEXES = {
+    "products": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("category", ASCENDING), ("price", ASCENDING)], name="category_price"),
+        IndexModel([("brand", ASCENDING), ("price", ASCENDING)], name="brand_price"),
+        # Keyset pagination: (sort key, id), walked in either direction
+        IndexModel([("created_at", ASCENDING), ("id", ASCENDING)], name="created_at_id"),
+        IndexModel([("price", ASCENDING), ("id", ASCENDING)], name="price_id"),
+        IndexModel([("rating", ASCENDING), ("id", ASCENDING)], name="rating_id"),
+        IndexModel([("search_keywords", ASCENDING)], name="search_keywords"),
+        IndexModel(
+            [("name", TEXT), ("brand", TEXT), ("category", TEXT), ("description", TEXT)],
+            name="text_search",
+            weights={"name": 10, "brand": 5, "category": 3, "description": 1},
+            default_language="english",
+        ),
+    ],
+    "reviews": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("product_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="product_created_desc"),
+    ],
+    "cart": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("product_id", ASCENDING)], name="user_product_unique", unique=True),
+    ],
+    "orders": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="user_created_id_desc"),
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING)], name="user_status_created_desc"),
+        # Admin listing across customers
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_id_desc"),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING)], name="status_created_desc"),
+        IndexModel([("payment_status", ASCENDING), ("created_at", DESCENDING)], name="payment_status_created_desc"),
+    ],
+    "discount_codes": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("code", ASCENDING), ("is_active", ASCENDING)], name="code_active"),
+    ],
+    "addresses": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+    ],
+}
+
+
+async def merge_duplicate_cart_lines(db):
+    """Fold duplicate (user_id, product_id) cart lines into the oldest one"""
+    pipeline = [
+        {"$sort": {"created_at": 1}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "product_id": "$product_id"},
+            "ids": {"$push": "$id"},
+            "quantity": {"$sum": "$quantity"},
+            "count": {"$sum": 1},
+        }},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+    merged = 0
+    async for group in db.cart.aggregate(pipeline):
+        keep, *duplicates = group["ids"]
+        await db.cart.update_one({"id": keep}, {"$set": {"quantity": group["quantity"]}})
+        await db.cart.delete_many({"id": {"$in": duplicates}})
+        merged += len(duplicates)
+    return merged
+
+
+async def ensure_indexes(db):
+    """Create any missing indexes; idempotent and safe to run on every startup"""
+    created = {}
+    for collection, models in INDEXES.items():
+        try:
+            try:
+                created[collection] = await db[collection].create_indexes(models)
+            except DuplicateKeyError:
+                if collection != "cart":
+                    raise
+                # Lines duplicated by the old read-modify-write add_to_cart
+                merged = await merge_duplicate_cart_lines(db)
+                logging.warning(f"Merged {merged} duplicate cart lines before indexing")
+                created[collection] = await db[collection].create_indexes(models)
+        except OperationFailure as e:
+            # e.g. duplicate cart lines blocking a unique index; keep serving
+            logging.error(f"Failed to create indexes on {collection}: {str(e)}")
+    return created
+
+
+async def verify_indexes(db):
+    """Return {collection: {"missing": [...], "extra": [...]}} against INDEXES"""
+    report = {}
+    for collection, models in INDEXES.items():
+        existing = await db[collection].index_information()
+        expected = {m.document["name"] for m in models}
+        actual = set(existing) - {"_id_"}
+        report[collection] = {
+            "missing": sorted(expected - actual),
+            "extra": sorted(actual - expected),
+        }
+    return report
+
+
+async def rebuild_indexes(db):
+    """Drop every secondary index on the managed collections and recreate them"""
+    for collection in INDEXES:
+        await db[collection].drop_indexes()
+    return await ensure_indexes(db)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Verify or rebuild MongoDB indexes, or run the deploy migrations")
+    parser.add_argument(
+        "command", choices=["ensure", "verify", "rebuild", "migrate"],
+        help="migrate = ensure plus the data backfills the app skips at startup under LAZY_INIT "
+             "and a rebuild of the daily order rollups over every order"
+    )
+    args = parser.parse_args()
+
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    try:
+        if args.command == "verify":
+            report = await verify_indexes(db)
+            ok = True
+            for collection, result in report.items():
+                status = "ok"
+                if result["missing"]:
+                    ok = False
+                    status = f"missing {', '.join(result['missing'])}"
+                if result["extra"]:
+                    status += f" (unmanaged: {', '.join(result['extra'])})"
+                print(f"{collection}: {status}")
+            return 0 if ok else 1
+
+        if args.command == "rebuild":
+            created = await rebuild_indexes(db)
+        else:
+            created = await ensure_indexes(db)
+        for collection, names in created.items():
+            print(f"{collection}: {', '.join(names)}")
+
+        if args.command == "migrate":
+            # Imported lazily: server.py needs the full app environment
+            import server
+            from admin import rebuild_all_daily_metrics
+            try:
+                await server.backfill_search_keywords()
+                await server.migrate_embedded_reviews()
+                span = await rebuild_all_daily_metrics()
+            finally:
+                if server.client is not None:
+                    server.client.close()
+            print("Search keywords backfilled; embedded reviews migrated")
+            print(f"Order rollups rebuilt for {span[0]}..{span[1]}" if span else "No orders to roll up")
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
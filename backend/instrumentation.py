@@ -0,0 +1,259 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from pymongo import monitoring
+
+if TYPE_CHECKING:
+    import httpx
+
+
+# Seconds; tuned for API latencies from a few ms up to slow Shopify calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition model"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Labelled histograms and counters. Mongo events arrive on Motor's executor
+    threads, so updates take a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[Tuple, Histogram]] = {}
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def observe(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines += self._header(name, "counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{format_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                lines += self._header(name, "histogram")
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f"{name}_bucket{format_labels(key + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{format_labels(key)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, name: str, kind: str) -> list:
+        lines = [f"# HELP {name} {self._help[name]}"] if name in self._help else []
+        return lines + [f"# TYPE {name} {kind}"]
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+def escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(key: Tuple) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in key) + "}"
+
+
+metrics = MetricsRegistry()
+metrics.describe("http_request_duration_seconds", "Time from request receipt to the end of the response body")
+metrics.describe("mongo_command_duration_seconds", "MongoDB command round-trip time as reported by the driver")
+metrics.describe("mongo_command_failures_total", "MongoDB commands that returned an error")
+metrics.describe("shopify_request_duration_seconds", "Time to response headers for Shopify API calls")
+metrics.describe("shopify_request_failures_total", "Shopify API calls that failed before a response")
+
+
+class RequestTimings:
+    """Per-request totals surfaced in the Server-Timing header"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self.durations[name] = self.durations.get(name, 0.0) + seconds
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def header(self, total: float) -> str:
+        entries = [f"total;dur={total * 1000:.1f}"]
+        for name, seconds in self.durations.items():
+            count = self.counts[name]
+            entries.append(f'{name};dur={seconds * 1000:.1f};desc="{count} call{"" if count == 1 else "s"}"')
+        return ", ".join(entries)
+
+
+# Motor copies the caller's context onto its executor threads, so command
+# events for a request's queries see that request's RequestTimings
+request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def record_timing(name: str, seconds: float):
+    timings = request_timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def timed(name: str):
+    """Add the wall time of the block to the current request's Server-Timing"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, time.perf_counter() - start)
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """pymongo command listener feeding mongo_command_* metrics and Server-Timing"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        seconds = event.duration_micros / 1e6
+        metrics.observe("mongo_command_duration_seconds", seconds, command=event.command_name)
+        record_timing("db", seconds)
+
+    def failed(self, event):
+        seconds = event.duration_micros / 1e6
+        metrics.observe("mongo_command_duration_seconds", seconds, command=event.command_name)
+        metrics.inc("mongo_command_failures_total", command=event.command_name)
+        record_timing("db", seconds)
+
+
+async def _start_http_timer(request: "httpx.Request"):
+    request.extensions["timing_start"] = time.perf_counter()
+
+
+async def _stop_http_timer(response: "httpx.Response"):
+    start = response.request.extensions.get("timing_start")
+    if start is None:
+        return
+    seconds = time.perf_counter() - start
+    metrics.observe(
+        "shopify_request_duration_seconds", seconds,
+        host=response.request.url.host, status=response.status_code
+    )
+    record_timing("shopify", seconds)
+
+
+# httpx only fires response hooks when a response arrives; transport errors
+# are counted by the caller via record_http_failure(error)
+HTTP_EVENT_HOOKS = {"request": [_start_http_timer], "response": [_stop_http_timer]}
+
+
+def record_http_failure(error: "httpx.RequestError"):
+    try:
+        request = error.request
+    except RuntimeError:
+        return
+    start = request.extensions.get("timing_start")
+    if start is not None:
+        record_timing("shopify", time.perf_counter() - start)
+    metrics.inc("shopify_request_failures_total", host=request.url.host)
+
+
+def route_template(scope) -> str:
+    """Path template of the matched route, so /products/{product_id} is one series"""
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is None or app is None:
+        return "unmatched"
+    templates = getattr(app, "_route_templates", None)
+    if templates is None:
+        templates = {getattr(r, "endpoint", None): r.path for r in app.routes}
+        app._route_templates = templates
+    if endpoint not in templates:
+        return "unmatched"
+    # Routes of a mounted app (e.g. /api/admin) are relative to its mount path
+    root_path = scope.get("root_path", "")
+    mount_path = root_path[len(scope.get("app_root_path", root_path)):]
+    return mount_path + templates[endpoint]
+
+
+class TimingMiddleware:
+    """
+    Pure ASGI middleware: records http_request_duration_seconds per route and,
+    with server_timing, adds a Server-Timing header (total, db, shopify, auth)
+    to every response. Time not attributed to db/shopify/auth is routing,
+    handler code and serialization.
+    """
+
+    def __init__(self, app, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    header = timings.header(time.perf_counter() - start).encode()
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header)]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timings.reset(token)
+            metrics.observe(
+                "http_request_duration_seconds", time.perf_counter() - start,
+                method=scope["method"], route=route_template(scope), status=status
+            )
@@ -0,0 +1,194 @@
+import asyncio
+import argparse
+import csv
+import itertools
+import json
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Iterator, List, Optional
+
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from starlette.concurrency import run_in_threadpool
+
+from server import db, product_keywords
+
+
+IMPORT_CHUNK_SIZE = 1000
+# Cap the per-row error list so a bad 50k-row file cannot blow up the report
+MAX_REPORTED_ERRORS = 1000
+FORMATS = ("csv", "ndjson")
+
+
+class ProductImportRow(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: Optional[str] = None
+    name: str
+    description: str = ""
+    price: float
+    category: str
+    brand: str
+    images: List[str] = []
+    stock: int = 0
+
+    @field_validator("images", mode="before")
+    @classmethod
+    def split_images(cls, value):
+        # CSV cells hold either a JSON list or "|"-separated URLs
+        if isinstance(value, str):
+            value = value.strip()
+            if value.startswith("["):
+                return json.loads(value)
+            return [url.strip() for url in value.split("|") if url.strip()]
+        return value
+
+
+def detect_format(filename: Optional[str]) -> str:
+    suffix = Path(filename or "").suffix.lower()
+    if suffix in (".ndjson", ".jsonl"):
+        return "ndjson"
+    return "csv"
+
+
+def read_rows(lines: Iterable[str], fmt: str) -> Iterator[tuple]:
+    """Yield (row_number, data, error) lazily from CSV or NDJSON lines"""
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+
+    if fmt == "ndjson":
+        for row_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError as e:
+                yield row_number, None, f"invalid JSON: {str(e)}"
+                continue
+            if not isinstance(data, dict):
+                yield row_number, None, "each line must be a JSON object"
+                continue
+            yield row_number, data, None
+        return
+
+    reader = csv.DictReader(lines)
+    for data in reader:
+        # Empty cells fall back to model defaults instead of failing coercion
+        yield reader.line_num, {k: v for k, v in data.items() if k and v not in (None, "")}, None
+
+
+async def rows_in_threadpool(rows: Iterable[tuple], batch_size: int = IMPORT_CHUNK_SIZE) -> AsyncIterator[tuple]:
+    """Advance a blocking row iterator (file reads, parsing) off the event loop, a batch at a time"""
+    rows = iter(rows)
+    while True:
+        batch = await run_in_threadpool(lambda: list(itertools.islice(rows, batch_size)))
+        if not batch:
+            return
+        for row in batch:
+            yield row
+
+
+def insert_defaults(fields: dict) -> dict:
+    """Model defaults for optional fields the row left out; applied only when the product is new"""
+    return {
+        name: field.get_default(call_default_factory=True)
+        for name, field in ProductImportRow.model_fields.items()
+        if name != "id" and not field.is_required() and name not in fields
+    }
+
+
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc']) or 'row'}: {e['msg']}" for e in error.errors())
+
+
+async def import_products(rows: AsyncIterator[tuple], chunk_size: int = IMPORT_CHUNK_SIZE, on_chunk=None) -> dict:
+    """
+    Validate rows and upsert them keyed on id with unordered, chunked
+    bulk_write calls. Rows without an id become new products; rows for an
+    existing product only overwrite the columns they contain. on_chunk, if
+    given, is awaited with the product ids written by each chunk.
+    """
+    report = {"processed": 0, "inserted": 0, "updated": 0, "failed": 0, "errors": []}
+
+    def fail(row_number: int, error: str):
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"row": row_number, "error": error})
+
+    chunk = []
+
+    async def flush():
+        if not chunk:
+            return
+        operations = [op for _, _, op in chunk]
+        try:
+            result = await db.products.bulk_write(operations, ordered=False)
+            report["inserted"] += result.upserted_count
+            report["updated"] += result.matched_count
+        except BulkWriteError as e:
+            details = e.details
+            report["inserted"] += details.get("nUpserted", 0)
+            report["updated"] += details.get("nMatched", 0)
+            for write_error in details.get("writeErrors", []):
+                fail(chunk[write_error["index"]][0], write_error.get("errmsg", "write failed"))
+        if on_chunk is not None:
+            await on_chunk([product_id for _, product_id, _ in chunk])
+        chunk.clear()
+
+    now = datetime.now(timezone.utc).isoformat()
+    async for row_number, data, error in rows:
+        report["processed"] += 1
+        if error is not None:
+            fail(row_number, error)
+            continue
+        try:
+            product = ProductImportRow.model_validate(data)
+        except (ValidationError, ValueError) as e:
+            fail(row_number, format_validation_error(e) if isinstance(e, ValidationError) else str(e))
+            continue
+
+        product_id = product.id or str(uuid.uuid4())
+        # Columns missing from the row keep their stored value on updates
+        fields = product.model_dump(exclude={"id"}, exclude_unset=True)
+        fields["search_keywords"] = product_keywords(fields)
+        chunk.append((row_number, product_id, UpdateOne(
+            {"id": product_id},
+            {
+                "$set": fields,
+                "$setOnInsert": {
+                    **insert_defaults(fields),
+                    "rating": 0.0, "rating_sum": 0.0, "review_count": 0, "created_at": now
+                }
+            },
+            upsert=True
+        )))
+        if len(chunk) >= chunk_size:
+            await flush()
+    await flush()
+    return report
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Bulk import products from CSV or NDJSON")
+    parser.add_argument("path", help="CSV (.csv) or NDJSON (.ndjson/.jsonl) file")
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+    started = datetime.now(timezone.utc)
+    with open(args.path, newline="", encoding="utf-8") as f:
+        report = await import_products(rows_in_threadpool(read_rows(f, fmt)), chunk_size=args.chunk_size)
+    elapsed = (datetime.now(timezone.utc) - started).total_seconds()
+
+    print(f"Processed {report['processed']} rows in {elapsed:.1f}s: "
+          f"{report['inserted']} inserted, {report['updated']} updated, {report['failed']} failed")
+    for error in report["errors"]:
+        print(f"  row {error['row']}: {error['error']}")
+    db.client.close()
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
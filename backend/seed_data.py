@@ -1,11 +1,16 @@
 import asyncio
+import argparse
+import random
+import time
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
 from pathlib import Path
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 import uuid
+from typing import Optional
 from passlib.context import CryptContext
+from pymongo.errors import BulkWriteError
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -398,5 +403,341 @@ async def seed_database():
     client.close()
 
 
+# Synthetic data at production scale, built from the hand-written catalog above
+
+GENERATED_COLLECTIONS = ["products", "reviews", "cart", "addresses", "orders", "discount_codes"]
+# Derived from orders: dropped with them and rebuilt after every load
+DERIVED_COLLECTIONS = ["order_daily_metrics"]
+DUPLICATE_KEY = 11000
+VARIANTS = ["Pro", "Lite", "Max", "Elite", "Compact", "Plus", "Sport", "Studio", "Travel", "XL"]
+COLORS = ["Black", "Graphite", "Red", "Blue", "Green", "White", "Sand", "Navy"]
+REVIEW_COMMENTS = [
+    "Exactly as described, great quality.",
+    "Solid build, arrived quickly.",
+    "Good value for the price.",
+    "Does the job, nothing special.",
+    "Sizing runs a little small.",
+    "Stopped working after a few weeks.",
+    "Use it every day, highly recommend.",
+]
+CITIES = [("Austin", "TX", "73301"), ("Denver", "CO", "80202"), ("Seattle", "WA", "98101"),
+          ("Chicago", "IL", "60601"), ("Miami", "FL", "33101"), ("Boston", "MA", "02108")]
+ORDER_STATUSES = ["pending", "processing", "shipped", "delivered", "delivered", "delivered", "cancelled"]
+
+
+def seeded_uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def user_id(n: int) -> str:
+    # Matches the Shopify customer ids the API stores as user_id
+    return f"gid://shopify/Customer/{n}"
+
+
+def generated_address(seed: int, n: int, index: int = 0) -> dict:
+    """Deterministic per (user, index) so orders can embed it without a lookup"""
+    rng = random.Random(f"{seed}:address:{n}:{index}")
+    city, state, zip_code = rng.choice(CITIES)
+    return {
+        "id": seeded_uuid(rng),
+        "user_id": user_id(n),
+        "full_name": f"Customer {n}",
+        "phone": f"555-{rng.randint(0, 9999):04d}",
+        "address_line1": f"{rng.randint(1, 9999)} {rng.choice(['Main', 'Oak', 'Pine', 'Maple', 'Cedar'])} St",
+        "address_line2": None,
+        "city": city,
+        "state": state,
+        "zip_code": zip_code,
+        "country": "US",
+        "is_default": index == 0,
+    }
+
+
+def generate_products(seed: int, count: int, reviews_per_product: int, users: int, now: datetime, catalog: list):
+    """
+    Yield ("products", doc) and ("reviews", doc) pairs. Ratings are aggregated
+    from the generated reviews so products and reviews agree. Appends
+    (id, name, price, image) to catalog for the order and cart generators.
+    """
+    from server import product_keywords
+
+    rng = random.Random(f"{seed}:products")
+    brands_by_category = {}
+    for template in products_data:
+        brands_by_category.setdefault(template["category"], set()).add(template["brand"])
+    brands_by_category = {k: sorted(v) for k, v in brands_by_category.items()}
+
+    for i in range(count):
+        template = products_data[i % len(products_data)]
+        product_id = seeded_uuid(rng)
+        created_at = now - timedelta(minutes=rng.randint(0, 3 * 365 * 24 * 60))
+        product = {
+            "id": product_id,
+            "name": f"{template['name']} {rng.choice(VARIANTS)} {rng.choice(COLORS)} {i // len(products_data) + 1}",
+            "description": template["description"],
+            "price": round(template["price"] * rng.uniform(0.6, 1.6), 2),
+            "category": template["category"],
+            "brand": rng.choice(brands_by_category[template["category"]]),
+            "images": list(template["images"]),
+            "stock": rng.randint(0, 500),
+            "created_at": created_at.isoformat(),
+        }
+
+        rating_sum = 0
+        review_count = rng.randint(0, reviews_per_product * 2) if users else 0
+        bias = rng.uniform(-1.5, 0.5)
+        for _ in range(review_count):
+            rating = max(1, min(5, round(4.5 + bias + rng.gauss(0, 0.8))))
+            rating_sum += rating
+            reviewer = rng.randrange(users)
+            yield "reviews", {
+                "id": seeded_uuid(rng),
+                "product_id": product_id,
+                "user_id": user_id(reviewer),
+                "user_name": f"Customer {reviewer}",
+                "rating": rating,
+                "comment": rng.choice(REVIEW_COMMENTS),
+                "created_at": (created_at + timedelta(minutes=rng.randint(1, 60 * 24 * 90))).isoformat(),
+            }
+
+        product["rating_sum"] = float(rating_sum)
+        product["review_count"] = review_count
+        product["rating"] = round(rating_sum / review_count, 1) if review_count else 0.0
+        product["search_keywords"] = product_keywords(product)
+        catalog.append((product_id, product["name"], product["price"], product["images"][0] if product["images"] else ""))
+        yield "products", product
+
+
+def generate_users(seed: int, users: int, cart_lines: int, catalog: list, now: datetime):
+    """Yield ("addresses", doc) and ("cart", doc) pairs for every user"""
+    rng = random.Random(f"{seed}:users")
+    for n in range(users):
+        for index in range(1 if rng.random() < 0.8 else 2):
+            yield "addresses", generated_address(seed, n, index)
+        line_count = min(len(catalog), rng.randint(0, cart_lines * 2))
+        # Distinct products per user, as the unique (user_id, product_id) index requires
+        for product_index in rng.sample(range(len(catalog)), line_count):
+            yield "cart", {
+                "id": seeded_uuid(rng),
+                "user_id": user_id(n),
+                "product_id": catalog[product_index][0],
+                "quantity": rng.randint(1, 3),
+                "created_at": (now - timedelta(minutes=rng.randint(0, 60 * 24 * 30))).isoformat(),
+            }
+
+
+def generate_discount_codes(seed: int, count: int, now: datetime, fixed: bool = True):
+    """The hand-written codes (unless fixed is False) and count generated ones, all with seeded ids"""
+    rng = random.Random(f"{seed}:discount_codes")
+    for code in discount_codes:
+        # Drawn even when skipped, so the generated codes do not depend on fixed
+        code_id = seeded_uuid(rng)
+        if fixed:
+            yield "discount_codes", {**code, "id": code_id, "created_at": now.isoformat()}
+    for n in range(count):
+        percentage = rng.random() < 0.7
+        yield "discount_codes", {
+            "id": seeded_uuid(rng),
+            "code": f"GEN{n:06d}",
+            "discount_type": "percentage" if percentage else "fixed",
+            "discount_value": rng.choice([5, 10, 15, 20, 25]) if percentage else rng.choice([5, 10, 20, 50]),
+            "is_active": rng.random() < 0.8,
+            "created_at": (now - timedelta(days=rng.randint(0, 720))).isoformat(),
+        }
+
+
+def generate_orders(seed: int, count: int, users: int, years: float, catalog: list, now: datetime):
+    rng = random.Random(f"{seed}:orders")
+    span = int(years * 365 * 24 * 60)
+    for _ in range(count):
+        n = rng.randrange(users)
+        items = []
+        for product_index in rng.sample(range(len(catalog)), min(len(catalog), rng.randint(1, 5))):
+            product_id, name, price, image = catalog[product_index]
+            items.append({
+                "product_id": product_id, "product_name": name, "product_image": image,
+                "price": price, "quantity": rng.randint(1, 3),
+            })
+        subtotal = round(sum(item["price"] * item["quantity"] for item in items), 2)
+        discount = round(subtotal * rng.choice([0.1, 0.15]), 2) if rng.random() < 0.2 else 0.0
+        status = rng.choice(ORDER_STATUSES)
+        yield "orders", {
+            "id": seeded_uuid(rng),
+            "user_id": user_id(n),
+            "items": items,
+            "subtotal": subtotal,
+            "discount": discount,
+            "total": round(subtotal - discount, 2),
+            "shipping_address": generated_address(seed, n),
+            "status": status,
+            "payment_status": "pending" if status in ("pending", "cancelled") else "paid",
+            "created_at": (now - timedelta(minutes=rng.randint(0, span))).isoformat(),
+        }
+
+
+async def write_stream(target_db, stream, chunk_size: int, concurrency: int, counts: dict, skipped: Optional[dict] = None):
+    """
+    Batch (collection, doc) pairs into per-collection chunks and write them
+    with unordered insert_many from concurrent workers. The queue is bounded,
+    so memory stays at a few chunks however large the dataset. The first
+    worker error stops the load and is raised here. If skipped is given,
+    documents rejected as duplicate keys are counted in it instead.
+    """
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            collection, docs = item
+            try:
+                await target_db[collection].insert_many(docs, ordered=False)
+                counts[collection] = counts.get(collection, 0) + len(docs)
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if skipped is None or any(error.get("code") != DUPLICATE_KEY for error in errors):
+                    raise
+                counts[collection] = counts.get(collection, 0) + e.details.get("nInserted", 0)
+                skipped[collection] = skipped.get(collection, 0) + len(errors)
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+
+    def raise_worker_error():
+        for task in workers:
+            if task.done() and task.exception() is not None:
+                raise task.exception()
+
+    async def put(item):
+        # A full queue would block forever once workers die, so wait on the
+        # running workers as well and surface the first failure
+        raise_worker_error()
+        put_task = asyncio.ensure_future(queue.put(item))
+        try:
+            while not put_task.done():
+                running = [task for task in workers if not task.done()]
+                await asyncio.wait([put_task, *running], return_when=asyncio.FIRST_COMPLETED)
+                raise_worker_error()
+        finally:
+            put_task.cancel()
+
+    try:
+        buffers = {}
+        for collection, doc in stream:
+            buffer = buffers.setdefault(collection, [])
+            buffer.append(doc)
+            if len(buffer) >= chunk_size:
+                await put((collection, buffer))
+                buffers[collection] = []
+        for collection, buffer in buffers.items():
+            if buffer:
+                await put((collection, buffer))
+        for _ in workers:
+            await put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+
+
+async def generate_dataset(
+    target_db,
+    seed: int = 42,
+    products: int = 10000,
+    reviews_per_product: int = 5,
+    users: int = 2000,
+    cart_lines: int = 3,
+    orders: int = 50000,
+    years: float = 2,
+    codes: int = 100,
+    chunk_size: int = 1000,
+    concurrency: int = 8,
+    append: bool = False,
+    skipped: Optional[dict] = None,
+) -> dict:
+    """
+    Stream a deterministic synthetic dataset into target_db and return the
+    number of documents written per collection. Unless append is set, the
+    generated collections are dropped first and indexes are built after the
+    load, which is much faster than maintaining them during it. The daily
+    order rollups are then rebuilt over the full span of the orders.
+
+    The same seed always produces the same ids, so appending with a seed
+    that was already loaded collides with the unique indexes. With append,
+    those duplicate-key rejections are counted per collection in skipped,
+    when given, instead of aborting the load; use a new seed to add data.
+    """
+    from admin import rebuild_all_daily_metrics
+    from db_indexes import ensure_indexes
+
+    if not append:
+        for collection in GENERATED_COLLECTIONS + DERIVED_COLLECTIONS:
+            await target_db[collection].drop()
+
+    now = datetime.now(timezone.utc)
+    catalog = []
+    counts = {}
+    # Only an append can collide with existing ids
+    if not append:
+        skipped = None
+    # Products go first: carts and orders reference the generated catalog
+    await write_stream(target_db, generate_products(seed, products, reviews_per_product, users, now, catalog),
+                       chunk_size, concurrency, counts, skipped)
+    # No unique index guards the hand-written codes (WELCOME10, ...), so an
+    # append loads them only if they are not there yet
+    fixed_codes = [code["code"] for code in discount_codes]
+    fixed = not append or not await target_db.discount_codes.find_one({"code": {"$in": fixed_codes}})
+    await write_stream(target_db, generate_discount_codes(seed, codes, now, fixed),
+                       chunk_size, concurrency, counts, skipped)
+    if catalog and users:
+        await write_stream(target_db, generate_users(seed, users, cart_lines, catalog, now), chunk_size, concurrency, counts, skipped)
+        await write_stream(target_db, generate_orders(seed, orders, users, years, catalog, now), chunk_size, concurrency, counts, skipped)
+    await ensure_indexes(target_db)
+    await rebuild_all_daily_metrics(target_db)
+    return counts
+
+
+async def generate_main(args):
+    started = time.perf_counter()
+    skipped = {}
+    counts = await generate_dataset(
+        db, seed=args.seed, products=args.products, reviews_per_product=args.reviews_per_product,
+        users=args.users, cart_lines=args.cart_lines, orders=args.orders, years=args.years,
+        codes=args.discount_codes, chunk_size=args.chunk_size, concurrency=args.concurrency, append=args.append,
+        skipped=skipped
+    )
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    for collection in GENERATED_COLLECTIONS:
+        duplicates = f" ({skipped[collection]} duplicates skipped)" if skipped.get(collection) else ""
+        print(f"{collection}: {counts.get(collection, 0)}{duplicates}")
+    if skipped:
+        print("Some ids already existed; pass a different --seed to append new documents")
+    print(f"Generated {total} documents in {elapsed:.1f}s ({total / elapsed:.0f} docs/s)")
+    print("Dashboard rollups rebuilt for every day with orders")
+    client.close()
+
+
 if __name__ == "__main__":
-    asyncio.run(seed_database())
+    parser = argparse.ArgumentParser(description="Seed the database, or generate a large synthetic dataset")
+    subparsers = parser.add_subparsers(dest="command")
+    generate = subparsers.add_parser("generate", help="stream a deterministic synthetic dataset")
+    generate.add_argument("--seed", type=int, default=42)
+    generate.add_argument("--products", type=int, default=10000)
+    generate.add_argument("--reviews-per-product", type=int, default=5, help="average; actual counts vary per product")
+    generate.add_argument("--users", type=int, default=2000)
+    generate.add_argument("--cart-lines", type=int, default=3, help="average open cart lines per user")
+    generate.add_argument("--orders", type=int, default=50000)
+    generate.add_argument("--years", type=float, default=2, help="spread order dates over this many years")
+    generate.add_argument("--discount-codes", type=int, default=100)
+    generate.add_argument("--chunk-size", type=int, default=1000)
+    generate.add_argument("--concurrency", type=int, default=8, help="concurrent insert_many workers")
+    generate.add_argument("--append", action="store_true",
+                          help="keep existing data instead of dropping it; ids that already exist are skipped, "
+                               "so use a different --seed to add new documents")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        asyncio.run(generate_main(args))
+    else:
+        asyncio.run(seed_database())
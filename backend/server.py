@@ -1,45 +1,534 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query, Response, status
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
 import os
+import asyncio
 import logging
-import httpx
 from pathlib import Path
-from pydantic import BaseModel, ConfigDict, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import TYPE_CHECKING, List, Optional, Union
 import uuid
 from datetime import datetime, timezone, timedelta
 import jwt
 import re
+import json
+import base64
+import time
+import hashlib
+import hmac
+import importlib
+from collections import OrderedDict
+from db_indexes import ensure_indexes
+from instrumentation import (
+    HTTP_EVENT_HOOKS, MongoCommandTimer, TimingMiddleware, metrics, record_http_failure, timed
+)
+
+if TYPE_CHECKING:
+    import httpx
+    from motor.motor_asyncio import AsyncIOMotorClient
 
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Latency histograms on /metrics (and Server-Timing headers, see below)
+INSTRUMENTATION = os.environ.get('INSTRUMENTATION', 'true').lower() == 'true'
+# When set, /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+# Without a token, /metrics is open only where this is true; public Vercel
+# deployments default to serving it with a token or not at all
+METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', 'false' if os.environ.get('VERCEL') else 'true').lower() == 'true'
+# Per-request db/shopify/auth timings in a Server-Timing response header
+SERVER_TIMING = os.environ.get('SERVER_TIMING', 'false' if os.environ.get('VERCEL') else 'true').lower() == 'true'
+
+# Serverless cold starts: skip startup work that can wait for first use (index
+# builds, the Shopify connection pool). On by default on Vercel.
+LAZY_INIT = os.environ.get('LAZY_INIT', 'true' if os.environ.get('VERCEL') else 'false').lower() == 'true'
+
 # MongoDB connection (for products, cart, orders only - NOT for users)
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+client: Optional["AsyncIOMotorClient"] = None
+# Indexes and data backfills are a deploy step (python db_indexes.py migrate) under LAZY_INIT
+ENSURE_INDEXES = os.environ.get('ENSURE_INDEXES', 'false' if LAZY_INIT else 'true').lower() == 'true'
+
+
+def get_mongo_client() -> "AsyncIOMotorClient":
+    """Create the Motor client on first use; mongodb+srv URLs resolve DNS here"""
+    global client
+    if client is None:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandTimer()] if INSTRUMENTATION else [])
+    return client
+
+
+class LazyDatabase:
+    """Stands in for the Motor database so importing server opens no client"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._db = None
+
+    def _resolve(self):
+        if self._db is None:
+            self._db = get_mongo_client()[self.name]
+        return self._db
+
+    def __getattr__(self, name: str):
+        return getattr(self._resolve(), name)
 
-# Create the main app
-app = FastAPI()
+    def __getitem__(self, name: str):
+        return self._resolve()[name]
+
+
+db = LazyDatabase(os.environ['DB_NAME'])
+
+# Product search
+SEARCH_MAX_TERMS = int(os.environ.get('SEARCH_MAX_TERMS', '8'))
+SEARCH_VOCABULARY_TTL = float(os.environ.get('SEARCH_VOCABULARY_TTL', '300'))
+
+# Catalog read-through cache
+CATALOG_CACHE_URL = os.environ.get('CATALOG_CACHE_URL')
+CATALOG_CACHE_TTL = float(os.environ.get('CATALOG_CACHE_TTL', '60'))
+CATALOG_CACHE_MAX_SIZE = int(os.environ.get('CATALOG_CACHE_MAX_SIZE', '2000'))
+# Sent on catalog responses so browsers and the Vercel CDN can reuse them
+CATALOG_CACHE_CONTROL = os.environ.get(
+    'CATALOG_CACHE_CONTROL', 'public, max-age=30, s-maxage=60, stale-while-revalidate=300'
+)
+
+# Product listing pagination
+PRODUCTS_MAX_LIMIT = 1000
+PRODUCT_SORTS = {
+    "created_at": ("created_at", 1),
+    "-created_at": ("created_at", -1),
+    "price": ("price", 1),
+    "-price": ("price", -1),
+    "rating": ("rating", 1),
+    "-rating": ("rating", -1),
+}
+PRODUCT_FIELDS = {
+    "id", "name", "description", "price", "category", "brand", "images",
+    "stock", "rating", "review_count", "reviews", "created_at"
+}
+PRODUCT_DETAIL_REVIEWS = int(os.environ.get('PRODUCT_DETAIL_REVIEWS', '5'))
+REVIEWS_MAX_LIMIT = 100
+PRODUCT_CARD_FIELDS = ["id", "name", "price", "category", "brand", "images", "stock", "rating", "review_count"]
+PRODUCT_BATCH_MAX = int(os.environ.get('PRODUCT_BATCH_MAX', '200'))
+# Lower bounds of the price facet buckets; the last bucket is open-ended
+PRODUCT_PRICE_BUCKETS = [
+    float(b) for b in os.environ.get('PRODUCT_PRICE_BUCKETS', '0,25,50,100,250,500').split(',')
+]
+# Rating facet counts products at or above each threshold, matching min_rating
+PRODUCT_RATING_THRESHOLDS = [4, 3, 2, 1]
+
+# Discount codes are served from memory; refreshed by change stream, or by
+# polling when change streams are unavailable (standalone mongod)
+DISCOUNT_CODES_REFRESH_INTERVAL = float(os.environ.get('DISCOUNT_CODES_REFRESH_INTERVAL', '30'))
+
+ORDERS_MAX_LIMIT = 1000
+
+# Orders commit stock, order and cart clear in one transaction when the
+# deployment supports them (replica set / Atlas)
+ORDER_TRANSACTIONS = os.environ.get('ORDER_TRANSACTIONS', 'true').lower() == 'true'
+
+# Create the main app; orjson serializes every response
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
 # Security
 security = HTTPBearer()
-SECRET_KEY = os.environ.get('JWT_SECRET', 'fitgear_jwt_secret_key_default_dev')
+DEFAULT_SECRET_KEY = 'fitgear_jwt_secret_key_default_dev'
+SECRET_KEY = os.environ.get('JWT_SECRET', DEFAULT_SECRET_KEY)
 ALGORITHM = "HS256"
 
+# Customers allowed to use /api/admin routes (comma-separated emails)
+ADMIN_EMAILS = {e.strip().lower() for e in os.environ.get('ADMIN_EMAILS', '').split(',') if e.strip()}
+
 # Shopify OAuth Configuration (PKCE - Public Client)
 SHOPIFY_CLIENT_ID = os.environ.get('SHOPIFY_CLIENT_ID', '49163ae9-7e32-4d93-a29c-d9fb330124c5')
 SHOPIFY_ACCOUNT_DOMAIN = os.environ.get('SHOPIFY_ACCOUNT_DOMAIN', 'https://account.fitgearzzz.com')
 SHOPIFY_TOKEN_ENDPOINT = f"{SHOPIFY_ACCOUNT_DOMAIN}/authentication/oauth/token"
 SHOPIFY_CUSTOMER_API = f"{SHOPIFY_ACCOUNT_DOMAIN}/account/customer/api/2024-10/graphql"
 
+# Locally signed session tokens issued after a verified Shopify login
+LOCAL_SESSIONS = os.environ.get('LOCAL_SESSIONS', 'false').lower() == 'true'
+SESSION_SECRET_MIN_LENGTH = 32
+if LOCAL_SESSIONS and (SECRET_KEY == DEFAULT_SECRET_KEY or len(SECRET_KEY) < SESSION_SECRET_MIN_LENGTH):
+    # A guessable secret would let anyone mint session tokens, admin ones included
+    logging.getLogger(__name__).error(f"LOCAL_SESSIONS needs a JWT_SECRET of at least {SESSION_SECRET_MIN_LENGTH} characters; local sessions disabled")
+    LOCAL_SESSIONS = False
+SESSION_TOKEN_TTL = int(os.environ.get('SESSION_TOKEN_TTL', '900'))
+SESSION_TOKEN_TYPE = "session"
+
+# Outbound HTTP pool shared by all Shopify calls
+SHOPIFY_HTTP_MAX_CONNECTIONS = int(os.environ.get('SHOPIFY_HTTP_MAX_CONNECTIONS', '100'))
+SHOPIFY_HTTP_MAX_KEEPALIVE = int(os.environ.get('SHOPIFY_HTTP_MAX_KEEPALIVE', '20'))
+SHOPIFY_HTTP_KEEPALIVE_EXPIRY = float(os.environ.get('SHOPIFY_HTTP_KEEPALIVE_EXPIRY', '30'))
+SHOPIFY_HTTP_TIMEOUT = float(os.environ.get('SHOPIFY_HTTP_TIMEOUT', '10'))
+SHOPIFY_HTTP_CONNECT_TIMEOUT = float(os.environ.get('SHOPIFY_HTTP_CONNECT_TIMEOUT', '5'))
+SHOPIFY_HTTP2 = os.environ.get('SHOPIFY_HTTP2', 'true').lower() == 'true'
+
+http_client: Optional["httpx.AsyncClient"] = None
+
+# Customer verification cache (token hash -> Shopify customer)
+CUSTOMER_CACHE_MAX_SIZE = int(os.environ.get('CUSTOMER_CACHE_MAX_SIZE', '10000'))
+CUSTOMER_CACHE_TTL = float(os.environ.get('CUSTOMER_CACHE_TTL', '300'))
+CUSTOMER_CACHE_NEGATIVE_TTL = float(os.environ.get('CUSTOMER_CACHE_NEGATIVE_TTL', '30'))
+
+
+def token_hash(access_token: str) -> str:
+    return hashlib.sha256(access_token.encode()).hexdigest()
+
+
+class CustomerCache:
+    """Bounded LRU cache of verified Shopify customers keyed by access token hash"""
+
+    def __init__(self, max_size: int, ttl: float, negative_ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, access_token: str):
+        """Return (found, customer); customer is None for a cached invalid token"""
+        key = token_hash(access_token)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[1]
+
+    def set(self, access_token: str, customer: Optional[dict], expires_in: Optional[float] = None):
+        ttl = self.ttl if customer else self.negative_ttl
+        if expires_in is not None:
+            ttl = min(ttl, expires_in)
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        key = token_hash(access_token)
+        self._entries[key] = (time.monotonic() + ttl, customer)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, access_token: str):
+        self._entries.pop(token_hash(access_token), None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+customer_cache = CustomerCache(CUSTOMER_CACHE_MAX_SIZE, CUSTOMER_CACHE_TTL, CUSTOMER_CACHE_NEGATIVE_TTL)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight task"""
+
+    def __init__(self):
+        self._calls = {}
+        self.shared = 0
+
+    async def do(self, key: str, fn):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.shared += 1
+        # Shield so one cancelled awaiter does not cancel the call for the others
+        return await asyncio.shield(task)
+
+
+verification_flight = SingleFlight()
+
+
+class MemoryCacheBackend:
+    """In-process LRU with per-entry TTL"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._versions = {}
+
+    async def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    async def set(self, key: str, value, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get_many(self, keys: List[str]) -> list:
+        return [await self.get(key) for key in keys]
+
+    async def set_many(self, values: dict, ttl: float):
+        for key, value in values.items():
+            await self.set(key, value, ttl)
+
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    async def get_version(self, name: Optional[str] = None) -> int:
+        return self._versions.get(name, 0)
+
+    async def get_versions(self, names: List[str]) -> List[int]:
+        return [self._versions.get(name, 0) for name in names]
+
+    async def incr_version(self, name: Optional[str] = None) -> int:
+        self._versions[name] = self._versions.get(name, 0) + 1
+        return self._versions[name]
+
+
+class RedisCacheBackend:
+    """Redis-compatible backend so several workers share one catalog cache"""
+
+    VERSION_KEY = "catalog:version"
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str):
+        raw = await self._redis.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value, ttl: float):
+        await self._redis.set(key, json.dumps(value), px=int(ttl * 1000))
+
+    async def get_many(self, keys: List[str]) -> list:
+        raws = await self._redis.mget(keys) if keys else []
+        return [json.loads(raw) if raw is not None else None for raw in raws]
+
+    async def set_many(self, values: dict, ttl: float):
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for key, value in values.items():
+                pipe.set(key, json.dumps(value), px=int(ttl * 1000))
+            await pipe.execute()
+
+    async def delete(self, key: str):
+        await self._redis.delete(key)
+
+    def version_key(self, name: Optional[str]) -> str:
+        return self.VERSION_KEY if name is None else f"{self.VERSION_KEY}:{name}"
+
+    async def get_version(self, name: Optional[str] = None) -> int:
+        return int(await self._redis.get(self.version_key(name)) or 0)
+
+    async def get_versions(self, names: List[str]) -> List[int]:
+        raws = await self._redis.mget([self.version_key(name) for name in names]) if names else []
+        return [int(raw or 0) for raw in raws]
+
+    async def incr_version(self, name: Optional[str] = None) -> int:
+        return await self._redis.incr(self.version_key(name))
+
+
+class CatalogCache:
+    """
+    Read-through cache for product reads. Listing keys embed the catalog
+    version, so any product or review write retires them all at once;
+    detail and batch keys embed a per-product version. Bumping a version
+    rather than deleting keys means a load that read the old document
+    before a write can only store it under a key nobody reads any more.
+    Stock-only writes use invalidate_products() and leave listings to
+    expire with the TTL.
+    """
+
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._flight = SingleFlight()
+
+    async def version(self) -> int:
+        return await self.backend.get_version()
+
+    async def listing_key(self, params: dict) -> str:
+        normalized = json.dumps({k: v for k, v in params.items() if v is not None}, sort_keys=True)
+        return f"products:v{await self.version()}:{normalized}"
+
+    async def product_key(self, product_id: str) -> str:
+        return f"product:{product_id}:v{await self.backend.get_version(product_id)}"
+
+    async def batch_keys(self, product_ids: List[str]) -> List[str]:
+        # Products without their reviews, as returned by /products/batch
+        versions = await self.backend.get_versions(product_ids)
+        return [f"product-batch:{product_id}:v{version}" for product_id, version in zip(product_ids, versions)]
+
+    async def get_or_load(self, key: str, loader):
+        if self.ttl > 0:
+            value = await self.backend.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+        self.misses += 1
+        
+        async def load():
+            value = await loader()
+            if self.ttl > 0 and value is not None:
+                await self.backend.set(key, value, self.ttl)
+            return value
+        
+        return await self._flight.do(key, load)
+
+    async def get_many_or_load(self, keys: List[str], loader) -> list:
+        """
+        Batch read-through: one backend round trip for all keys, then a single
+        loader call with the missing keys, which returns {key: value}
+        """
+        values = await self.backend.get_many(keys) if self.ttl > 0 else [None] * len(keys)
+        missing = [key for key, value in zip(keys, values) if value is None]
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+        if not missing:
+            return values
+        
+        loaded = await loader(missing)
+        if self.ttl > 0 and loaded:
+            await self.backend.set_many(loaded, self.ttl)
+        return [value if value is not None else loaded.get(key) for key, value in zip(keys, values)]
+
+    async def invalidate_products(self, *product_ids: str):
+        """
+        Retire only the detail and batch entries. For writes such as stock
+        moves at checkout: cached listings keep the old values for up to
+        CATALOG_CACHE_TTL instead of being retired on every order.
+        """
+        for product_id in product_ids:
+            await self.backend.incr_version(product_id)
+
+    async def invalidate(self, *product_ids: str) -> int:
+        await self.invalidate_products(*product_ids)
+        return await self.backend.incr_version()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def content_etag(value) -> str:
+    """Strong ETag from the canonical JSON of a cached catalog value"""
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return f'"{hashlib.sha256(canonical.encode()).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+
+
+def catalog_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+
+
+def create_catalog_cache() -> CatalogCache:
+    backend = None
+    if CATALOG_CACHE_URL:
+        try:
+            backend = RedisCacheBackend(CATALOG_CACHE_URL)
+        except ImportError:
+            logging.error("redis is not installed; using the in-process catalog cache")
+    return CatalogCache(backend or MemoryCacheBackend(CATALOG_CACHE_MAX_SIZE), CATALOG_CACHE_TTL)
+
+
+catalog_cache = create_catalog_cache()
+
+
+class DiscountCodeTable:
+    """Active discount codes held in memory so validation needs no DB I/O"""
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self.mode = "idle"
+        self._codes = {}
+        self._loaded = False
+        self._task = None
+
+    async def load(self):
+        docs = await db.discount_codes.find({"is_active": True}, {"_id": 0}).to_list(None)
+        self._codes = {doc["code"]: doc for doc in docs}
+        self._loaded = True
+
+    def put(self, doc: dict):
+        doc = {k: v for k, v in doc.items() if k != "_id"}
+        if doc.get("is_active"):
+            self._codes[doc["code"]] = doc
+        else:
+            self._codes.pop(doc["code"], None)
+
+    async def get(self, code: str) -> Optional[dict]:
+        if not self._loaded:
+            await self.load()
+        return self._codes.get(code.upper())
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _refresh(self):
+        try:
+            async with db.discount_codes.watch(full_document="updateLookup") as stream:
+                self.mode = "change_stream"
+                # Load after the stream is open so no write falls in between
+                await self.load()
+                async for change in stream:
+                    if change["operationType"] in ("insert", "update", "replace") and change.get("fullDocument"):
+                        self.put(change["fullDocument"])
+                    else:
+                        # Deletes only carry _id; the table is tiny, so reload
+                        await self.load()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.info(f"Discount code change stream unavailable ({str(e)}); polling instead")
+        
+        self.mode = "polling"
+        while True:
+            try:
+                await self.load()
+            except Exception as e:
+                logging.error(f"Error refreshing discount codes: {str(e)}")
+            await asyncio.sleep(self.refresh_interval)
+
+
+discount_codes_table = DiscountCodeTable(DISCOUNT_CODES_REFRESH_INTERVAL)
+
 
 # Helper Functions
 def create_token(data: dict, expires_delta: timedelta = timedelta(days=7)):
@@ -55,62 +544,314 @@ def decode_token(token: str):
         return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
-async def verify_shopify_token(access_token: str):
-    """Verify Shopify access token and get customer info"""
+def shape_documents(model, docs: List[dict]) -> List[dict]:
+    """
+    Trusted construction: Mongo documents written from these models already
+    have the right types, so only fill defaults and drop extra keys instead of
+    validating every document twice (once here, once against response_model).
+    """
+    fields = model.model_fields
+    defaults = {
+        name: field.get_default(call_default_factory=True)
+        for name, field in fields.items() if not field.is_required()
+    }
+    return [
+        {name: doc[name] if name in doc else defaults[name] for name in fields if name in doc or name in defaults}
+        for doc in docs
+    ]
+
+
+def customer_to_user(customer: dict) -> dict:
+    return {
+        "id": customer["id"],
+        "email": customer["emailAddress"]["emailAddress"],
+        "name": customer["displayName"],
+        "firstName": customer.get("firstName", ""),
+        "lastName": customer.get("lastName", "")
+    }
+
+
+def create_session_token(user: dict, expires_in: Optional[float] = None):
+    """Sign a short-lived session JWT for an already verified customer"""
+    ttl = SESSION_TOKEN_TTL if expires_in is None else min(SESSION_TOKEN_TTL, int(expires_in))
+    token = create_token(
+        {
+            "sub": user["id"],
+            "email": user["email"],
+            "name": user["name"],
+            "firstName": user.get("firstName", ""),
+            "lastName": user.get("lastName", ""),
+            "typ": SESSION_TOKEN_TYPE,
+            "iat": datetime.now(timezone.utc)
+        },
+        expires_delta=timedelta(seconds=ttl)
+    )
+    return token, ttl
+
+
+def is_session_token(token: str) -> bool:
+    # Shopify customer access tokens are opaque; ours are three-part JWTs
+    return token.count(".") == 2
+
+
+def shopify_timeout() -> "httpx.Timeout":
+    import httpx
+    return httpx.Timeout(SHOPIFY_HTTP_TIMEOUT, connect=SHOPIFY_HTTP_CONNECT_TIMEOUT)
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    """Return the application-wide pooled HTTP client, creating it on first use"""
+    global http_client
+    if http_client is None or http_client.is_closed:
+        # Deferred with the client: only Shopify token paths need httpx
+        import httpx
+        http2 = SHOPIFY_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logging.warning("h2 is not installed; falling back to HTTP/1.1 for Shopify calls")
+                http2 = False
+        http_client = httpx.AsyncClient(
+            http2=http2,
+            event_hooks=HTTP_EVENT_HOOKS if INSTRUMENTATION else None,
+            timeout=shopify_timeout(),
+            limits=httpx.Limits(
+                max_connections=SHOPIFY_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=SHOPIFY_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=SHOPIFY_HTTP_KEEPALIVE_EXPIRY
+            )
+        )
+    return http_client
+
+
+async def fetch_shopify_customer(access_token: str):
+    """
+    Query the Shopify Customer Account API for the token's customer.
+    Returns (customer, cacheable); network failures are not cacheable.
+    """
+    import httpx
     try:
-        async with httpx.AsyncClient() as http_client:
-            response = await http_client.post(
-                SHOPIFY_CUSTOMER_API,
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {access_token}"
-                },
-                json={
-                    "query": """
-                    query getCustomer {
-                        customer {
-                            id
-                            displayName
-                            emailAddress {
-                                emailAddress
-                            }
-                            firstName
-                            lastName
+        response = await get_http_client().post(
+            SHOPIFY_CUSTOMER_API,
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {access_token}"
+            },
+            json={
+                "query": """
+                query getCustomer {
+                    customer {
+                        id
+                        displayName
+                        emailAddress {
+                            emailAddress
                         }
+                        firstName
+                        lastName
                     }
-                    """
-                },
-                timeout=10.0
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("data", {}).get("customer")
-            return None
+                }
+                """
+            },
+            timeout=shopify_timeout()
+        )
+        
+        if response.status_code == 200:
+            result = response.json()
+            return (result.get("data") or {}).get("customer"), True
+        # Only an explicit rejection means the token itself is bad
+        return None, response.status_code in (401, 403)
+    except httpx.RequestError as e:
+        record_http_failure(e)
+        logging.error(f"Error verifying Shopify token: {str(e)}")
+        return None, False
     except Exception as e:
         logging.error(f"Error verifying Shopify token: {str(e)}")
-        return None
+        return None, False
+
+
+async def verify_shopify_token(access_token: str, expires_in: Optional[float] = None):
+    """Verify Shopify access token and get customer info (cached per token)"""
+    found, customer = customer_cache.get(access_token)
+    if found:
+        return customer
+    
+    async def fetch_and_cache():
+        customer, cacheable = await fetch_shopify_customer(access_token)
+        if cacheable:
+            customer_cache.set(access_token, customer, expires_in)
+        return customer
+    
+    # Parallel requests carrying the same token share one upstream call
+    return await verification_flight.do(token_hash(access_token), fetch_and_cache)
 
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Get current user from Shopify access token"""
+    """Get current user from a local session token or a Shopify access token"""
     token = credentials.credentials
-    customer = await verify_shopify_token(token)
+    
+    if LOCAL_SESSIONS and is_session_token(token):
+        with timed("auth"):
+            payload = decode_token(token)
+        if payload.get("typ") != SESSION_TOKEN_TYPE:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        return {
+            "id": payload["sub"],
+            "email": payload["email"],
+            "name": payload["name"],
+            "firstName": payload.get("firstName", ""),
+            "lastName": payload.get("lastName", "")
+        }
+    
+    with timed("auth"):
+        customer = await verify_shopify_token(token)
     
     if not customer:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     
-    return {
-        "id": customer["id"],
-        "email": customer["emailAddress"]["emailAddress"],
-        "name": customer["displayName"],
-        "firstName": customer.get("firstName", ""),
-        "lastName": customer.get("lastName", "")
-    }
+    return customer_to_user(customer)
+
+
+async def get_admin_user(current_user: dict = Depends(get_current_user)):
+    """Current user, if their email is listed in ADMIN_EMAILS"""
+    if current_user["email"].lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+
+def search_terms(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens; drops regex and $text operator characters"""
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def product_keywords(product: dict) -> List[str]:
+    """Prefix-searchable tokens stored on each product as search_keywords"""
+    text = " ".join(str(product.get(field, "")) for field in ("name", "brand", "category"))
+    return sorted(set(search_terms(text)))
+
+
+_search_vocabulary = {"expires_at": 0.0, "terms": []}
+
+
+async def get_search_vocabulary() -> List[str]:
+    """Distinct product keywords, refreshed periodically, for typo correction"""
+    if _search_vocabulary["expires_at"] <= time.monotonic():
+        _search_vocabulary["terms"] = await db.products.distinct("search_keywords")
+        _search_vocabulary["expires_at"] = time.monotonic() + SEARCH_VOCABULARY_TTL
+    return _search_vocabulary["terms"]
+
+
+def text_search_filter(terms: List[str]) -> dict:
+    return {"$text": {"$search": " ".join(terms)}}
+
+
+def prefix_search_filter(terms: List[str]) -> dict:
+    return {"$and": [{"search_keywords": {"$regex": f"^{re.escape(t)}"}} for t in terms]}
+
+
+async def search_predicates(terms: List[str]):
+    """
+    Search predicates in the order they are tried: weighted $text match, then
+    the index-backed keyword prefix match, then both again with typo-corrected
+    terms. Correction only runs if the earlier predicates are consumed.
+    """
+    yield text_search_filter(terms)
+    yield prefix_search_filter(terms)
+    
+    import difflib
+    vocabulary = await get_search_vocabulary()
+    corrected = []
+    for term in terms:
+        matches = difflib.get_close_matches(term, vocabulary, n=1, cutoff=0.75)
+        corrected.append(matches[0] if matches else term)
+    if corrected != terms:
+        yield text_search_filter(corrected)
+        yield prefix_search_filter(corrected)
+
+
+async def find_search_matches(query: dict, limit: int, projection: dict) -> list:
+    """$text matches ranked by score, prefix matches by rating"""
+    if "$text" not in query:
+        return await db.products.find(query, projection).sort("rating", -1).to_list(limit)
+    score = {"score": {"$meta": "textScore"}}
+    try:
+        return await db.products.find(query, {**projection, **score}).sort([("score", score["score"])]).to_list(limit)
+    except OperationFailure as e:
+        # IndexNotFound: indexes not built yet (python db_indexes.py migrate)
+        if e.code != 27:
+            raise
+        logging.warning("Product text index missing; searching by keyword prefix only")
+        return []
+
+
+async def search_products(query: dict, terms: List[str], limit: int, projection: Optional[dict] = None):
+    """Relevance-ranked search with the first of search_predicates() that matches"""
+    projection = projection or {"_id": 0}
+    async for predicate in search_predicates(terms):
+        products = await find_search_matches({**query, **predicate}, limit, projection)
+        if products:
+            return products
+    return []
+
+
+async def search_match(query: dict, terms: List[str]) -> dict:
+    """The predicate search_products() ranks results with, so counts cover the same matches"""
+    async for predicate in search_predicates(terms):
+        if await find_search_matches({**query, **predicate}, 1, {"_id": 0, "id": 1}):
+            return predicate
+    return prefix_search_filter(terms)
+
+
+async def backfill_search_keywords():
+    """Add search_keywords to products written before search indexing existed"""
+    cursor = db.products.find({"search_keywords": {"$exists": False}}, {"_id": 0, "id": 1, "name": 1, "brand": 1, "category": 1})
+    async for product in cursor:
+        await db.products.update_one({"id": product["id"]}, {"$set": {"search_keywords": product_keywords(product)}})
+
+
+def encode_cursor(sort: str, field: str, doc: dict) -> str:
+    payload = json.dumps({"s": sort, "v": doc.get(field), "id": doc["id"]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(payload, dict) or payload.get("s") != sort or "id" not in payload:
+        raise HTTPException(status_code=400, detail="Cursor does not match sort order")
+    return payload
+
+
+def keyset_filter(field: str, direction: int, cursor: dict) -> dict:
+    """Documents strictly after the cursor in (field, id) order"""
+    op = "$gt" if direction == 1 else "$lt"
+    return {"$or": [
+        {field: {op: cursor["v"]}},
+        {field: cursor["v"], "id": {op: cursor["id"]}}
+    ]}
+
+
+def product_projection(fields: Optional[str], sort: Optional[str] = None) -> dict:
+    """Mongo projection for listings; reviews are only sent when asked for"""
+    if not fields:
+        return {"_id": 0, "reviews": 0, "rating_sum": 0, "search_keywords": 0}
+    requested = PRODUCT_CARD_FIELDS if fields == "card" else [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = set(requested) - PRODUCT_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    projection = {"_id": 0, "id": 1}
+    projection.update({f: 1 for f in requested})
+    if sort:
+        # The cursor needs the sort key even if the client did not ask for it
+        projection[PRODUCT_SORTS[sort][0]] = 1
+    return projection
 
 
 # Models
@@ -125,6 +866,18 @@ class ShopifyOAuthTokenResponse(BaseModel):
     id_token: Optional[str] = None
     expires_in: int
     token_type: str = "Bearer"
+    session_token: Optional[str] = None
+    session_expires_in: Optional[int] = None
+
+
+class SessionRefreshRequest(BaseModel):
+    access_token: str
+
+
+class SessionTokenResponse(BaseModel):
+    session_token: str
+    session_expires_in: int
+    token_type: str = "Bearer"
 
 
 class Address(BaseModel):
@@ -155,6 +908,9 @@ class AddressCreate(BaseModel):
 
 
 class Review(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: Optional[str] = None
+    product_id: Optional[str] = None
     user_id: str
     user_name: str
     rating: int
@@ -188,6 +944,40 @@ class ProductCreate(BaseModel):
     stock: int
 
 
+class ProductBatchRequest(BaseModel):
+    ids: List[str] = Field(..., max_length=PRODUCT_BATCH_MAX)
+
+
+class ProductBatchResult(BaseModel):
+    id: str
+    found: bool
+    product: Optional[Product] = None
+
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+
+class PriceBucket(BaseModel):
+    # [min, max): select it on /products with min_price=min&price_below=max
+    min: float
+    max: Optional[float] = None
+    count: int
+
+
+class RatingBucket(BaseModel):
+    min_rating: int
+    count: int
+
+
+class ProductFacets(BaseModel):
+    categories: List[FacetCount]
+    brands: List[FacetCount]
+    prices: List[PriceBucket]
+    ratings: List[RatingBucket]
+
+
 class ProductUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
@@ -222,6 +1012,26 @@ class CartItemUpdate(BaseModel):
     quantity: int
 
 
+class CartProduct(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    name: str
+    price: float
+    images: List[str] = []
+    stock: int
+
+
+class CartLine(CartItem):
+    product: Optional[CartProduct] = None
+    line_total: float
+
+
+class CartSummary(BaseModel):
+    items: List[CartLine]
+    item_count: int
+    subtotal: float
+
+
 class OrderItem(BaseModel):
     product_id: str
     product_name: str
@@ -244,11 +1054,29 @@ class Order(BaseModel):
     created_at: str
 
 
-class OrderCreate(BaseModel):
-    items: List[OrderItem]
-    subtotal: float
-    discount: float
+class OrderSummary(BaseModel):
+    id: str
+    created_at: str
     total: float
+    status: str
+    payment_status: str
+    item_count: int
+
+
+class OrderItemCreate(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    product_id: str
+    quantity: int
+
+
+class OrderCreate(BaseModel):
+    # Client-side prices and totals are accepted for compatibility but ignored;
+    # the order is always priced from the catalog
+    items: List[OrderItemCreate]
+    subtotal: Optional[float] = None
+    discount: Optional[float] = None
+    total: Optional[float] = None
+    discount_code: Optional[str] = None
     shipping_address: Address
 
 
@@ -286,6 +1114,7 @@ async def shopify_oauth_callback(request: ShopifyOAuthCallbackRequest):
     Exchange authorization code for access token with Shopify Customer Account API
     Uses PKCE flow (no client secret required)
     """
+    import httpx
     
     # Prepare token exchange request (PKCE - no client secret)
     token_data = {
@@ -297,33 +1126,46 @@ async def shopify_oauth_callback(request: ShopifyOAuthCallbackRequest):
     }
     
     try:
-        async with httpx.AsyncClient() as http_client:
-            response = await http_client.post(
-                SHOPIFY_TOKEN_ENDPOINT,
-                data=token_data,
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-                timeout=10.0
-            )
-            
-            if response.status_code != 200:
-                error_detail = response.text
-                logging.error(f"Shopify OAuth error: {error_detail}")
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Failed to exchange code for token: {error_detail}"
-                )
-            
-            token_response = response.json()
-            
-            return ShopifyOAuthTokenResponse(
-                access_token=token_response["access_token"],
-                refresh_token=token_response.get("refresh_token"),
-                id_token=token_response.get("id_token"),
-                expires_in=token_response.get("expires_in", 3600),
-                token_type=token_response.get("token_type", "Bearer")
+        response = await get_http_client().post(
+            SHOPIFY_TOKEN_ENDPOINT,
+            data=token_data,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            timeout=shopify_timeout()
+        )
+        
+        if response.status_code != 200:
+            error_detail = response.text
+            logging.error(f"Shopify OAuth error: {error_detail}")
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Failed to exchange code for token: {error_detail}"
             )
+        
+        token_response = response.json()
+        
+        expires_in = token_response.get("expires_in", 3600)
+        
+        # Verify the customer once; this also primes the customer cache so it
+        # never outlives the new token
+        customer = await verify_shopify_token(token_response["access_token"], expires_in=expires_in)
+        
+        session_token = None
+        session_expires_in = None
+        if LOCAL_SESSIONS and customer:
+            session_token, session_expires_in = create_session_token(customer_to_user(customer), expires_in)
+        
+        return ShopifyOAuthTokenResponse(
+            access_token=token_response["access_token"],
+            refresh_token=token_response.get("refresh_token"),
+            id_token=token_response.get("id_token"),
+            expires_in=expires_in,
+            token_type=token_response.get("token_type", "Bearer"),
+            session_token=session_token,
+            session_expires_in=session_expires_in
+        )
             
     except httpx.RequestError as e:
+        record_http_failure(e)
         logging.error(f"Network error during Shopify OAuth: {str(e)}")
         raise HTTPException(
             status_code=503,
@@ -337,6 +1179,22 @@ async def shopify_oauth_callback(request: ShopifyOAuthCallbackRequest):
         )
 
 
+@api_router.post("/auth/refresh", response_model=SessionTokenResponse)
+async def refresh_session(request: SessionRefreshRequest):
+    """Re-check the Shopify access token and issue a fresh session token"""
+    if not LOCAL_SESSIONS:
+        raise HTTPException(status_code=404, detail="Local sessions are disabled")
+    
+    # Always go back to Shopify so a revoked token cannot keep refreshing
+    customer_cache.invalidate(request.access_token)
+    customer = await verify_shopify_token(request.access_token)
+    if not customer:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    
+    session_token, session_expires_in = create_session_token(customer_to_user(customer))
+    return SessionTokenResponse(session_token=session_token, session_expires_in=session_expires_in)
+
+
 @api_router.get("/auth/me")
 async def get_me(current_user: dict = Depends(get_current_user)):
     """Get current logged-in customer from Shopify"""
@@ -344,49 +1202,282 @@ async def get_me(current_user: dict = Depends(get_current_user)):
 
 
 # Product Routes
-@api_router.get("/products", response_model=List[Product])
-async def get_products(
-    category: Optional[str] = None,
-    search: Optional[str] = None,
-    min_price: Optional[float] = None,
-    max_price: Optional[float] = None,
-    brand: Optional[str] = None,
-    min_rating: Optional[float] = None,
-    ids: Optional[str] = None
-):
+def product_filter(
+    category: Optional[str],
+    brand: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    min_rating: Optional[float],
+    price_below: Optional[float] = None
+) -> dict:
+    """max_price is inclusive; price_below is the exclusive bound price facet buckets use"""
     query = {}
-    
-    if ids:
-        product_ids = ids.split(',')
-        query["id"] = {"$in": product_ids}
-        products = await db.products.find(query, {"_id": 0}).to_list(len(product_ids))
-        return [Product(**p) for p in products]
-    
     if category:
         query["category"] = category
     if brand:
         query["brand"] = brand
-    if search:
-        query["name"] = {"$regex": search, "$options": "i"}
-    if min_price is not None or max_price is not None:
+    if min_price is not None or max_price is not None or price_below is not None:
         query["price"] = {}
         if min_price is not None:
             query["price"]["$gte"] = min_price
         if max_price is not None:
             query["price"]["$lte"] = max_price
+        if price_below is not None:
+            query["price"]["$lt"] = price_below
     if min_rating is not None:
         query["rating"] = {"$gte": min_rating}
+    return query
+
+
+async def query_products(
+    category: Optional[str],
+    search: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    price_below: Optional[float],
+    brand: Optional[str],
+    min_rating: Optional[float],
+    ids: Optional[str],
+    sort: Optional[str],
+    cursor: Optional[str],
+    limit: int,
+    fields: Optional[str]
+):
+    """Run a product listing query; returns {"products": [...], "next_cursor": ...}"""
+    projection = product_projection(fields, sort)
+    
+    if ids:
+        product_ids = ids.split(',')
+        products = await db.products.find({"id": {"$in": product_ids}}, projection).to_list(len(product_ids))
+        return {"products": products, "next_cursor": None}
     
-    products = await db.products.find(query, {"_id": 0}).to_list(1000)
-    return [Product(**p) for p in products]
+    query = product_filter(category, brand, min_price, max_price, min_rating, price_below)
+    
+    terms = search_terms(search)[:SEARCH_MAX_TERMS] if search else []
+    if terms:
+        # Relevance-ranked; not keyset paginated
+        products = await search_products(query, terms, limit, projection)
+        for p in products:
+            p.pop("score", None)
+        return {"products": products, "next_cursor": None}
+    
+    if not sort:
+        products = await db.products.find(query, projection).to_list(limit)
+        return {"products": products, "next_cursor": None}
+    
+    field, direction = PRODUCT_SORTS[sort]
+    if cursor:
+        query = {"$and": [query, keyset_filter(field, direction, decode_cursor(cursor, sort))]}
+    products = await db.products.find(query, projection).sort([(field, direction), ("id", direction)]).to_list(limit + 1)
+    next_cursor = None
+    if len(products) > limit:
+        products = products[:limit]
+        next_cursor = encode_cursor(sort, field, products[-1])
+    return {"products": products, "next_cursor": next_cursor}
 
 
-@api_router.get("/products/{product_id}", response_model=Product)
-async def get_product(product_id: str):
-    product = await db.products.find_one({"id": product_id}, {"_id": 0})
+@api_router.get("/products", response_model=List[Product])
+async def get_products(
+    category: Optional[str] = None,
+    search: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    price_below: Optional[float] = None,
+    brand: Optional[str] = None,
+    min_rating: Optional[float] = None,
+    ids: Optional[str] = None,
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(PRODUCTS_MAX_LIMIT, ge=1, le=PRODUCTS_MAX_LIMIT),
+    fields: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    List products. Pass sort (and the X-Next-Cursor header value as cursor)
+    for keyset pagination, and fields=card or a field list to trim documents.
+    max_price is inclusive; price_below is exclusive, like the price facets.
+    """
+    if cursor and not sort:
+        sort = "-created_at"
+    if sort is not None and sort not in PRODUCT_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(PRODUCT_SORTS)}")
+    
+    params = {
+        "category": category, "search": search, "min_price": min_price, "max_price": max_price,
+        "price_below": price_below, "brand": brand, "min_rating": min_rating, "ids": ids, "sort": sort,
+        "cursor": cursor, "limit": limit, "fields": fields
+    }
+    async def load():
+        result = await query_products(**params)
+        if not fields:
+            result["products"] = shape_documents(Product, result["products"])
+        result["etag"] = content_etag(result)
+        return result
+    
+    key = await catalog_cache.listing_key(params)
+    result = await catalog_cache.get_or_load(key, load)
+    
+    headers = catalog_headers(result["etag"])
+    if result["next_cursor"]:
+        headers["X-Next-Cursor"] = result["next_cursor"]
+    if etag_matches(if_none_match, result["etag"]):
+        return Response(status_code=304, headers=headers)
+    # Already shaped (or deliberately partial with fields=); skip re-validation
+    return ORJSONResponse(content=result["products"], headers=headers)
+
+
+async def query_product_facets(
+    category: Optional[str],
+    search: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    price_below: Optional[float],
+    brand: Optional[str],
+    min_rating: Optional[float]
+) -> dict:
+    """
+    Facet counts in one $facet aggregation. Each facet applies every filter
+    except its own, so the sidebar still lists the alternatives to the
+    current selection.
+    """
+    filters = product_filter(category, brand, min_price, max_price, min_rating, price_below)
+    
+    def match_without(key: str) -> dict:
+        return {"$match": {k: v for k, v in filters.items() if k != key}}
+    
+    pipeline = []
+    terms = search_terms(search)[:SEARCH_MAX_TERMS] if search else []
+    if terms:
+        # Same predicate the listing used; $text must be the first stage
+        pipeline.append({"$match": await search_match(filters, terms)})
+    pipeline.append({"$facet": {
+        "categories": [
+            match_without("category"),
+            {"$group": {"_id": "$category", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+        ],
+        "brands": [
+            match_without("brand"),
+            {"$group": {"_id": "$brand", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+        ],
+        "prices": [
+            match_without("price"),
+            {"$bucket": {
+                "groupBy": "$price",
+                "boundaries": PRODUCT_PRICE_BUCKETS + [float("inf")],
+                "default": "other",
+                "output": {"count": {"$sum": 1}},
+            }},
+        ],
+        "ratings": [
+            match_without("rating"),
+            {"$group": {"_id": {"$floor": "$rating"}, "count": {"$sum": 1}}},
+        ],
+    }})
+    
+    result = (await db.products.aggregate(pipeline).to_list(1))[0]
+    
+    upper_bounds = PRODUCT_PRICE_BUCKETS[1:] + [None]
+    price_counts = {b["_id"]: b["count"] for b in result["prices"]}
+    rating_counts = {int(r["_id"] or 0): r["count"] for r in result["ratings"]}
+    return {
+        "categories": [{"value": c["_id"], "count": c["count"]} for c in result["categories"] if c["_id"]],
+        "brands": [{"value": b["_id"], "count": b["count"]} for b in result["brands"] if b["_id"]],
+        "prices": [
+            {"min": low, "max": high, "count": price_counts.get(low, 0)}
+            for low, high in zip(PRODUCT_PRICE_BUCKETS, upper_bounds)
+        ],
+        "ratings": [
+            {"min_rating": t, "count": sum(n for floor, n in rating_counts.items() if floor >= t)}
+            for t in PRODUCT_RATING_THRESHOLDS
+        ],
+    }
+
+
+@api_router.get("/products/facets", response_model=ProductFacets)
+async def get_product_facets(
+    category: Optional[str] = None,
+    search: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    price_below: Optional[float] = None,
+    brand: Optional[str] = None,
+    min_rating: Optional[float] = None,
+    if_none_match: Optional[str] = Header(None)
+):
+    """Filter sidebar counts for the same filters /products accepts"""
+    params = {
+        "category": category, "search": search, "min_price": min_price, "max_price": max_price,
+        "price_below": price_below, "brand": brand, "min_rating": min_rating
+    }
+    async def load():
+        facets = await query_product_facets(**params)
+        return {"facets": facets, "etag": content_etag(facets)}
+    
+    key = await catalog_cache.listing_key({"facets": True, **params})
+    result = await catalog_cache.get_or_load(key, load)
+    
+    headers = catalog_headers(result["etag"])
+    if etag_matches(if_none_match, result["etag"]):
+        return Response(status_code=304, headers=headers)
+    return ORJSONResponse(content=result["facets"], headers=headers)
+
+
+@api_router.post("/products/batch", response_model=List[ProductBatchResult])
+async def get_products_batch(request: ProductBatchRequest):
+    """
+    Products in request order, one entry per requested id; unknown ids come
+    back with found=false. Cached ids are served without touching Mongo and
+    the rest are fetched with a single $in.
+    """
+    unique_ids = list(dict.fromkeys(request.ids))
+    keys = await catalog_cache.batch_keys(unique_ids)
+    key_ids = dict(zip(keys, unique_ids))
+    id_keys = dict(zip(unique_ids, keys))
+    
+    async def load(missing_keys: List[str]) -> dict:
+        missing_ids = [key_ids[key] for key in missing_keys]
+        docs = await db.products.find(
+            {"id": {"$in": missing_ids}}, {"_id": 0, "reviews": 0, "search_keywords": 0}
+        ).to_list(len(missing_ids))
+        return {id_keys[p["id"]]: p for p in shape_documents(Product, docs)}
+    
+    products = dict(zip(unique_ids, await catalog_cache.get_many_or_load(keys, load)))
+    return ORJSONResponse(content=[
+        {"id": product_id, "found": products[product_id] is not None, "product": products[product_id]}
+        for product_id in request.ids
+    ])
+
+
+async def load_product(product_id: str):
+    product = await db.products.find_one({"id": product_id}, {"_id": 0, "reviews": 0, "search_keywords": 0})
     if not product:
+        return None
+    # Only the latest few; the rest are paged from /products/{id}/reviews
+    product["reviews"] = await db.reviews.find(
+        {"product_id": product_id}, {"_id": 0}
+    ).sort([("created_at", -1), ("id", -1)]).to_list(PRODUCT_DETAIL_REVIEWS)
+    return product
+
+
+@api_router.get("/products/{product_id}", response_model=Product)
+async def get_product(product_id: str, if_none_match: Optional[str] = Header(None)):
+    async def load():
+        product = await load_product(product_id)
+        if product is None:
+            return None
+        product = shape_documents(Product, [product])[0]
+        return {"product": product, "etag": content_etag(product)}
+    
+    cached = await catalog_cache.get_or_load(await catalog_cache.product_key(product_id), load)
+    if not cached:
         raise HTTPException(status_code=404, detail="Product not found")
-    return Product(**product)
+    
+    headers = catalog_headers(cached["etag"])
+    if etag_matches(if_none_match, cached["etag"]):
+        return Response(status_code=304, headers=headers)
+    return ORJSONResponse(content=cached["product"], headers=headers)
 
 
 @api_router.post("/products", response_model=Product)
@@ -397,12 +1488,14 @@ async def create_product(product_data: ProductCreate, current_user: dict = Depen
         "id": product_id,
         **product_data.model_dump(),
         "rating": 0.0,
+        "rating_sum": 0.0,
         "review_count": 0,
-        "reviews": [],
         "created_at": datetime.now(timezone.utc).isoformat()
     }
+    product_doc["search_keywords"] = product_keywords(product_doc)
     
     await db.products.insert_one(product_doc)
+    await catalog_cache.invalidate()
     return Product(**product_doc)
 
 
@@ -413,8 +1506,11 @@ async def update_product(product_id: str, product_data: ProductUpdate, current_u
         raise HTTPException(status_code=404, detail="Product not found")
     
     update_data = {k: v for k, v in product_data.model_dump().items() if v is not None}
+    if update_data.keys() & {"name", "brand", "category"}:
+        update_data["search_keywords"] = product_keywords({**existing, **update_data})
     if update_data:
         await db.products.update_one({"id": product_id}, {"$set": update_data})
+        await catalog_cache.invalidate(product_id)
     
     updated = await db.products.find_one({"id": product_id}, {"_id": 0})
     return Product(**updated)
@@ -425,17 +1521,34 @@ async def delete_product(product_id: str, current_user: dict = Depends(get_curre
     result = await db.products.delete_one({"id": product_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
+    await catalog_cache.invalidate(product_id)
     return {"message": "Product deleted"}
 
 
 # Review Routes
+@api_router.get("/products/{product_id}/reviews", response_model=List[Review])
+async def get_reviews(
+    product_id: str,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=REVIEWS_MAX_LIMIT)
+):
+    """Newest reviews first; pass the X-Next-Cursor header back as cursor"""
+    query = {"product_id": product_id}
+    if cursor:
+        query = {"$and": [query, keyset_filter("created_at", -1, decode_cursor(cursor, "-created_at"))]}
+    reviews = await db.reviews.find(query, {"_id": 0}).sort([("created_at", -1), ("id", -1)]).to_list(limit + 1)
+    if len(reviews) > limit:
+        reviews = reviews[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor("-created_at", "created_at", reviews[-1])
+    return [Review(**r) for r in reviews]
+
+
 @api_router.post("/products/{product_id}/reviews")
 async def add_review(product_id: str, review_data: ReviewCreate, current_user: dict = Depends(get_current_user)):
-    product = await db.products.find_one({"id": product_id}, {"_id": 0})
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    
     review = {
+        "id": str(uuid.uuid4()),
+        "product_id": product_id,
         "user_id": current_user["id"],
         "user_name": current_user["name"],
         "rating": review_data.rating,
@@ -443,71 +1556,156 @@ async def add_review(product_id: str, review_data: ReviewCreate, current_user: d
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     
-    reviews = product.get("reviews", [])
-    reviews.append(review)
-    
-    avg_rating = sum(r["rating"] for r in reviews) / len(reviews)
+    # The review is written first so a failed write never leaves the rating
+    # counting a review that does not exist; it is removed if the update fails
+    await db.reviews.insert_one(review)
+    review.pop("_id", None)
+    try:
+        # Running sum + count updated atomically in one round-trip; the pipeline
+        # form lets rating be derived from the incremented values in the same write
+        product = await db.products.find_one_and_update(
+            {"id": product_id},
+            [
+                {"$set": {
+                    "rating_sum": {"$add": [
+                        {"$ifNull": ["$rating_sum", {"$multiply": [{"$ifNull": ["$rating", 0]}, {"$ifNull": ["$review_count", 0]}]}]},
+                        review_data.rating
+                    ]},
+                    "review_count": {"$add": [{"$ifNull": ["$review_count", 0]}, 1]}
+                }},
+                {"$set": {"rating": {"$round": [{"$divide": ["$rating_sum", "$review_count"]}, 1]}}}
+            ],
+            projection={"_id": 0, "id": 1}
+        )
+    except Exception:
+        await db.reviews.delete_one({"id": review["id"]})
+        raise
+    if not product:
+        await db.reviews.delete_one({"id": review["id"]})
+        raise HTTPException(status_code=404, detail="Product not found")
     
-    await db.products.update_one(
-        {"id": product_id},
-        {"$set": {"reviews": reviews, "rating": round(avg_rating, 1), "review_count": len(reviews)}}
-    )
+    await catalog_cache.invalidate(product_id)
     
     return {"message": "Review added", "review": review}
 
 
+def embedded_review_id(product_id: str, index: int) -> str:
+    """Stable id for an embedded review, so a re-run migration upserts instead of duplicating"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"fitgear:product/{product_id}/review/{index}"))
+
+
+async def migrate_embedded_reviews():
+    """
+    Move reviews still embedded in product documents into the reviews
+    collection. Safe to re-run after a crash: reviews are upserted on a
+    deterministic id before the embedded copies are removed.
+    """
+    cursor = db.products.find({"reviews.0": {"$exists": True}}, {"_id": 0, "id": 1, "reviews": 1})
+    async for product in cursor:
+        reviews = [
+            {**r, "id": r.get("id") or embedded_review_id(product["id"], index), "product_id": product["id"]}
+            for index, r in enumerate(product["reviews"])
+        ]
+        await db.reviews.bulk_write(
+            [UpdateOne({"id": r["id"]}, {"$setOnInsert": r}, upsert=True) for r in reviews],
+            ordered=False
+        )
+        await db.products.update_one(
+            {"id": product["id"]},
+            {
+                "$set": {"rating_sum": sum(r["rating"] for r in reviews), "review_count": len(reviews)},
+                "$unset": {"reviews": ""}
+            }
+        )
+
+
 # Cart Routes
+async def get_cart_summary(user_id: str) -> CartSummary:
+    """Cart lines joined with card-level product data in one aggregation"""
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$sort": {"created_at": 1}},
+        {"$lookup": {
+            "from": "products",
+            "localField": "product_id",
+            "foreignField": "id",
+            "pipeline": [
+                {"$project": {"_id": 0, "id": 1, "name": 1, "price": 1, "stock": 1, "images": {"$slice": ["$images", 1]}}}
+            ],
+            "as": "product"
+        }},
+        {"$project": {"_id": 0, "id": 1, "user_id": 1, "product_id": 1, "quantity": 1, "created_at": 1, "product": {"$first": "$product"}}}
+    ]
+    lines = []
+    async for line in db.cart.aggregate(pipeline):
+        product = line.get("product")
+        line["line_total"] = round(product["price"] * line["quantity"], 2) if product else 0.0
+        lines.append(CartLine(**line))
+    return CartSummary(
+        items=lines,
+        item_count=sum(line.quantity for line in lines),
+        subtotal=round(sum(line.line_total for line in lines), 2)
+    )
+
+
 @api_router.get("/cart", response_model=List[CartItem])
 async def get_cart(current_user: dict = Depends(get_current_user)):
     cart_items = await db.cart.find({"user_id": current_user["id"]}, {"_id": 0}).to_list(1000)
-    return [CartItem(**item) for item in cart_items]
+    return ORJSONResponse(content=shape_documents(CartItem, cart_items))
 
 
-@api_router.post("/cart", response_model=CartItem)
-async def add_to_cart(item_data: CartItemCreate, current_user: dict = Depends(get_current_user)):
-    existing = await db.cart.find_one({
-        "user_id": current_user["id"],
-        "product_id": item_data.product_id
-    }, {"_id": 0})
-    
-    if existing:
-        new_quantity = existing["quantity"] + item_data.quantity
-        await db.cart.update_one(
-            {"id": existing["id"]},
-            {"$set": {"quantity": new_quantity}}
-        )
-        updated = await db.cart.find_one({"id": existing["id"]}, {"_id": 0})
-        return CartItem(**updated)
-    
-    cart_id = str(uuid.uuid4())
-    cart_doc = {
-        "id": cart_id,
-        "user_id": current_user["id"],
-        "product_id": item_data.product_id,
-        "quantity": item_data.quantity,
-        "created_at": datetime.now(timezone.utc).isoformat()
-    }
-    
-    await db.cart.insert_one(cart_doc)
-    return CartItem(**cart_doc)
+@api_router.get("/cart/summary", response_model=CartSummary)
+async def get_cart_with_products(current_user: dict = Depends(get_current_user)):
+    return await get_cart_summary(current_user["id"])
 
 
-@api_router.put("/cart/{cart_id}", response_model=CartItem)
-async def update_cart_item(cart_id: str, update_data: CartItemUpdate, current_user: dict = Depends(get_current_user)):
-    existing = await db.cart.find_one({"id": cart_id, "user_id": current_user["id"]}, {"_id": 0})
-    if not existing:
+@api_router.post("/cart", response_model=Union[CartSummary, CartItem])
+async def add_to_cart(item_data: CartItemCreate, expand: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    # One atomic upsert on the unique (user_id, product_id) index
+    query = {"user_id": current_user["id"], "product_id": item_data.product_id}
+    update = {
+        "$inc": {"quantity": item_data.quantity},
+        "$setOnInsert": {
+            "id": str(uuid.uuid4()),
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+    }
+    try:
+        item = await db.cart.find_one_and_update(
+            query, update, projection={"_id": 0}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # A concurrent request inserted the line first; now it matches
+        item = await db.cart.find_one_and_update(
+            query, update, projection={"_id": 0}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+    if expand == "products":
+        return await get_cart_summary(current_user["id"])
+    return CartItem(**item)
+
+
+@api_router.put("/cart/{cart_id}", response_model=Union[CartSummary, CartItem])
+async def update_cart_item(cart_id: str, update_data: CartItemUpdate, expand: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    item = await db.cart.find_one_and_update(
+        {"id": cart_id, "user_id": current_user["id"]},
+        {"$set": {"quantity": update_data.quantity}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if not item:
         raise HTTPException(status_code=404, detail="Cart item not found")
-    
-    await db.cart.update_one({"id": cart_id}, {"$set": {"quantity": update_data.quantity}})
-    updated = await db.cart.find_one({"id": cart_id}, {"_id": 0})
-    return CartItem(**updated)
+    if expand == "products":
+        return await get_cart_summary(current_user["id"])
+    return CartItem(**item)
 
 
 @api_router.delete("/cart/{cart_id}")
-async def remove_from_cart(cart_id: str, current_user: dict = Depends(get_current_user)):
+async def remove_from_cart(cart_id: str, expand: Optional[str] = None, current_user: dict = Depends(get_current_user)):
     result = await db.cart.delete_one({"id": cart_id, "user_id": current_user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Cart item not found")
+    if expand == "products":
+        return await get_cart_summary(current_user["id"])
     return {"message": "Item removed from cart"}
 
 
@@ -521,7 +1719,7 @@ async def clear_cart(current_user: dict = Depends(get_current_user)):
 @api_router.get("/addresses", response_model=List[Address])
 async def get_addresses(current_user: dict = Depends(get_current_user)):
     addresses = await db.addresses.find({"user_id": current_user["id"]}, {"_id": 0}).to_list(1000)
-    return [Address(**addr) for addr in addresses]
+    return ORJSONResponse(content=shape_documents(Address, addresses))
 
 
 @api_router.post("/addresses", response_model=Address)
@@ -552,28 +1750,251 @@ async def delete_address(address_id: str, current_user: dict = Depends(get_curre
 
 
 # Order Routes
+class InsufficientStock(Exception):
+    pass
+
+
+async def find_discount_code(code: str) -> Optional[dict]:
+    # No-op once running; under LAZY_INIT this is where refreshing starts
+    discount_codes_table.start()
+    return await discount_codes_table.get(code)
+
+
+def calculate_discount(discount_code: dict, subtotal: float) -> float:
+    if discount_code["discount_type"] == "percentage":
+        discount = (subtotal * discount_code["discount_value"]) / 100
+    else:
+        discount = discount_code["discount_value"]
+    return round(min(discount, subtotal), 2)
+
+
+async def price_order_items(items: List[OrderItemCreate]):
+    """Price items from the catalog in one $in lookup; returns (order items, subtotal)"""
+    quantities = {}
+    for item in items:
+        if item.quantity <= 0:
+            raise HTTPException(status_code=400, detail="Item quantities must be positive")
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    if not quantities:
+        raise HTTPException(status_code=400, detail="Order has no items")
+    
+    products = await db.products.find(
+        {"id": {"$in": list(quantities)}},
+        {"_id": 0, "id": 1, "name": 1, "price": 1, "images": {"$slice": 1}}
+    ).to_list(len(quantities))
+    by_id = {p["id"]: p for p in products}
+    missing = [pid for pid in quantities if pid not in by_id]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Products not found: {', '.join(missing)}")
+    
+    order_items = [
+        {
+            "product_id": pid,
+            "product_name": by_id[pid]["name"],
+            "product_image": (by_id[pid].get("images") or [""])[0],
+            "price": by_id[pid]["price"],
+            "quantity": quantity
+        }
+        for pid, quantity in quantities.items()
+    ]
+    subtotal = round(sum(i["price"] * i["quantity"] for i in order_items), 2)
+    return order_items, subtotal
+
+
+async def place_order_transaction(order_doc: dict):
+    """Reserve stock, insert the order and clear the cart atomically"""
+    async def commit(session):
+        result = await db.products.bulk_write(
+            [
+                UpdateOne({"id": i["product_id"], "stock": {"$gte": i["quantity"]}}, {"$inc": {"stock": -i["quantity"]}})
+                for i in order_doc["items"]
+            ],
+            ordered=False,
+            session=session
+        )
+        if result.matched_count != len(order_doc["items"]):
+            # Raising aborts the transaction, releasing the partial reservation
+            raise InsufficientStock()
+        await db.orders.insert_one(order_doc, session=session)
+        await db.cart.delete_many({"user_id": order_doc["user_id"]}, session=session)
+    
+    async with await db.client.start_session() as session:
+        # with_transaction retries write conflicts between concurrent checkouts
+        await session.with_transaction(commit)
+
+
+async def place_order_compensating(order_doc: dict):
+    """Fallback for standalone mongod: reserve item by item, undo on shortfall"""
+    reserved = []
+    try:
+        for item in order_doc["items"]:
+            result = await db.products.update_one(
+                {"id": item["product_id"], "stock": {"$gte": item["quantity"]}},
+                {"$inc": {"stock": -item["quantity"]}}
+            )
+            if result.matched_count == 0:
+                raise InsufficientStock()
+            reserved.append(item)
+        await db.orders.insert_one(order_doc)
+    except BaseException:
+        if reserved:
+            await db.products.bulk_write(
+                [UpdateOne({"id": i["product_id"]}, {"$inc": {"stock": i["quantity"]}}) for i in reserved],
+                ordered=False
+            )
+        raise
+    await db.cart.delete_many({"user_id": order_doc["user_id"]})
+
+
+async def record_order_metrics(order_doc: dict):
+    """Fold one order into its day's rollup in order_daily_metrics"""
+    inc = {
+        "order_count": 1,
+        "revenue": order_doc["total"],
+        "discount": order_doc["discount"],
+        "items_sold": sum(i["quantity"] for i in order_doc["items"])
+    }
+    names = {}
+    for item in order_doc["items"]:
+        key = f"products.{item['product_id']}"
+        inc[f"{key}.quantity"] = item["quantity"]
+        inc[f"{key}.revenue"] = item["price"] * item["quantity"]
+        names[f"{key}.name"] = item["product_name"]
+    await db.order_daily_metrics.update_one(
+        {"_id": order_doc["created_at"][:10]}, {"$inc": inc, "$set": names}, upsert=True
+    )
+
+
 @api_router.post("/orders", response_model=Order)
 async def create_order(order_data: OrderCreate, current_user: dict = Depends(get_current_user)):
+    global ORDER_TRANSACTIONS
+    
+    order_items, subtotal = await price_order_items(order_data.items)
+    
+    discount = 0.0
+    if order_data.discount_code:
+        discount_code = await find_discount_code(order_data.discount_code)
+        if not discount_code:
+            raise HTTPException(status_code=400, detail="Invalid discount code")
+        discount = calculate_discount(discount_code, subtotal)
+    
     order_id = str(uuid.uuid4())
     order_doc = {
         "id": order_id,
         "user_id": current_user["id"],
-        **order_data.model_dump(),
+        "items": order_items,
+        "subtotal": subtotal,
+        "discount": discount,
+        "total": round(subtotal - discount, 2),
+        "shipping_address": order_data.shipping_address.model_dump(),
         "status": "pending",
         "payment_status": "pending",
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     
-    await db.orders.insert_one(order_doc)
-    await db.cart.delete_many({"user_id": current_user["id"]})
+    try:
+        if ORDER_TRANSACTIONS:
+            try:
+                await place_order_transaction(order_doc)
+            except OperationFailure as e:
+                # IllegalOperation: transactions need a replica set
+                if e.code != 20:
+                    raise
+                logging.warning("MongoDB transactions unavailable; using compensating order writes")
+                ORDER_TRANSACTIONS = False
+                await place_order_compensating(order_doc)
+        else:
+            await place_order_compensating(order_doc)
+    except InsufficientStock:
+        raise HTTPException(status_code=409, detail="Insufficient stock for one or more items")
+    
+    order_doc.pop("_id", None)
+    # Only stock changed: listings may show it stale for up to CATALOG_CACHE_TTL
+    await catalog_cache.invalidate_products(*(i["product_id"] for i in order_items))
+    try:
+        await record_order_metrics(order_doc)
+    except Exception as e:
+        # The order is committed; a rebuild of the day repairs the rollup
+        logging.error(f"Failed to record order metrics: {str(e)}")
     
     return Order(**order_doc)
 
 
-@api_router.get("/orders", response_model=List[Order])
-async def get_orders(current_user: dict = Depends(get_current_user)):
-    orders = await db.orders.find({"user_id": current_user["id"]}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return [Order(**order) for order in orders]
+def parse_iso_datetime(value: str, name: str) -> str:
+    """Normalize a client timestamp to the UTC isoformat orders are stored with"""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO 8601 datetime")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+
+ORDER_SUMMARY_PROJECTION = {
+    "_id": 0, "id": 1, "created_at": 1, "total": 1, "status": 1, "payment_status": 1,
+    "item_count": {"$sum": "$items.quantity"}
+}
+
+
+async def list_orders(
+    query: dict,
+    cursor: Optional[str],
+    limit: int,
+    status: Optional[str],
+    created_from: Optional[str],
+    created_to: Optional[str],
+    view: str
+):
+    """Newest-first keyset page of orders matching query; returns ORJSONResponse"""
+    if view not in ("full", "summary"):
+        raise HTTPException(status_code=400, detail="view must be 'full' or 'summary'")
+    if status:
+        query["status"] = status
+    if created_from or created_to:
+        query["created_at"] = {}
+        if created_from:
+            query["created_at"]["$gte"] = parse_iso_datetime(created_from, "created_from")
+        if created_to:
+            query["created_at"]["$lt"] = parse_iso_datetime(created_to, "created_to")
+    if cursor:
+        query = {"$and": [query, keyset_filter("created_at", -1, decode_cursor(cursor, "-created_at"))]}
+    
+    if view == "summary":
+        orders = await db.orders.aggregate([
+            {"$match": query},
+            {"$sort": {"created_at": -1, "id": -1}},
+            {"$limit": limit + 1},
+            {"$project": ORDER_SUMMARY_PROJECTION}
+        ]).to_list(limit + 1)
+    else:
+        orders = await db.orders.find(query, {"_id": 0}).sort([("created_at", -1), ("id", -1)]).to_list(limit + 1)
+    
+    headers = {}
+    if len(orders) > limit:
+        orders = orders[:limit]
+        headers["X-Next-Cursor"] = encode_cursor("-created_at", "created_at", orders[-1])
+    model = OrderSummary if view == "summary" else Order
+    return ORJSONResponse(content=shape_documents(model, orders), headers=headers)
+
+
+@api_router.get("/orders", response_model=Union[List[Order], List[OrderSummary]])
+async def get_orders(
+    cursor: Optional[str] = None,
+    limit: int = Query(ORDERS_MAX_LIMIT, ge=1, le=ORDERS_MAX_LIMIT),
+    status: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    view: str = "full",
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    The customer's orders, newest first. view=summary returns list-view rows
+    (id, created_at, total, status, item_count); full detail is in get_order.
+    """
+    return await list_orders(
+        {"user_id": current_user["id"]}, cursor, limit, status, created_from, created_to, view
+    )
 
 
 @api_router.get("/orders/{order_id}", response_model=Order)
@@ -596,24 +2017,14 @@ async def update_order_status(order_id: str, status: str, current_user: dict = D
 # Discount Code Routes
 @api_router.post("/discount/apply", response_model=ApplyDiscountResponse)
 async def apply_discount(request: ApplyDiscountRequest):
-    discount_code = await db.discount_codes.find_one(
-        {"code": request.code.upper(), "is_active": True},
-        {"_id": 0}
-    )
+    discount_code = await find_discount_code(request.code)
     
     if not discount_code:
         return ApplyDiscountResponse(valid=False, discount=0, message="Invalid discount code")
     
-    if discount_code["discount_type"] == "percentage":
-        discount = (request.subtotal * discount_code["discount_value"]) / 100
-    else:
-        discount = discount_code["discount_value"]
-    
-    discount = min(discount, request.subtotal)
-    
     return ApplyDiscountResponse(
         valid=True,
-        discount=round(discount, 2),
+        discount=calculate_discount(discount_code, request.subtotal),
         message=f"Discount code applied: {discount_code['code']}"
     )
 
@@ -631,6 +2042,8 @@ async def create_discount_code(code_data: DiscountCodeCreate, current_user: dict
     }
     
     await db.discount_codes.insert_one(code_doc)
+    # Visible to this worker immediately; others pick it up from the stream
+    discount_codes_table.put(code_doc)
     return DiscountCode(**code_doc)
 
 
@@ -640,8 +2053,34 @@ async def get_discount_codes(current_user: dict = Depends(get_current_user)):
     return [DiscountCode(**code) for code in codes]
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus scrape endpoint"""
+    if not METRICS_TOKEN and not METRICS_PUBLIC:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if METRICS_TOKEN and not hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+class LazyApp:
+    """ASGI app that imports "module:attribute" on its first request"""
+
+    def __init__(self, target: str):
+        self.target = target
+        self._app = None
+
+    async def __call__(self, scope, receive, send):
+        if self._app is None:
+            module, attribute = self.target.split(":")
+            self._app = getattr(importlib.import_module(module), attribute)
+        await self._app(scope, receive, send)
+
+
 # Include the router in the main app
 app.include_router(api_router)
+# Rarely used; imported on the first /api/admin request
+app.mount("/api/admin", LazyApp("admin:admin_app"))
 
 app.add_middleware(
     CORSMiddleware,
@@ -649,8 +2088,13 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"] + (["Server-Timing"] if SERVER_TIMING else []),
 )
 
+if INSTRUMENTATION:
+    # Outermost, so the histogram covers CORS handling and the full body send
+    app.add_middleware(TimingMiddleware, server_timing=SERVER_TIMING)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -658,6 +2102,30 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def startup_http_client():
+    if not LAZY_INIT:
+        get_http_client()
+
+
+@app.on_event("startup")
+async def startup_db_indexes():
+    if ENSURE_INDEXES:
+        await ensure_indexes(db)
+        await backfill_search_keywords()
+        await migrate_embedded_reviews()
+
+
+@app.on_event("startup")
+async def startup_discount_codes():
+    if not LAZY_INIT:
+        discount_codes_table.start()
+
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    await discount_codes_table.stop()
+    if client is not None:
+        client.close()
+    if http_client is not None:
+        await http_client.aclose()
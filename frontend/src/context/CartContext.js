@@ -20,33 +20,24 @@ export const CartProvider = ({ children }) => {
     }
   }, [user]);
 
-  const fetchCart = async () => {
-    try {
-      const response = await api.get('/cart');
-      setCart(response.data);
-      await fetchCartProducts(response.data);
-    } catch (error) {
-      console.error('Error fetching cart:', error);
-    }
+  const applyCartSummary = (summary) => {
+    const productData = {};
+    const items = summary.items.map(({ product, line_total, ...item }) => {
+      if (product) {
+        productData[product.id] = product;
+      }
+      return item;
+    });
+    setCart(items);
+    setProducts(productData);
   };
 
-  const fetchCartProducts = async (cartItems) => {
-    const productIds = [...new Set(cartItems.map((item) => item.product_id))];
-    
-    if (productIds.length === 0) {
-      setProducts({});
-      return;
-    }
-
+  const fetchCart = async () => {
     try {
-      const response = await api.get(`/products?ids=${productIds.join(',')}`);
-      const productData = {};
-      response.data.forEach((product) => {
-        productData[product.id] = product;
-      });
-      setProducts(productData);
+      const response = await api.get('/cart/summary');
+      applyCartSummary(response.data);
     } catch (error) {
-      console.error('Error fetching products:', error);
+      console.error('Error fetching cart:', error);
     }
   };
 
@@ -57,8 +48,8 @@ export const CartProvider = ({ children }) => {
     }
 
     try {
-      await api.post('/cart', { product_id: productId, quantity });
-      await fetchCart();
+      const response = await api.post('/cart?expand=products', { product_id: productId, quantity });
+      applyCartSummary(response.data);
       toast.success('Added to cart!');
     } catch (error) {
       toast.error('Failed to add to cart');
@@ -67,8 +58,8 @@ export const CartProvider = ({ children }) => {
 
   const updateCartItem = async (cartId, quantity) => {
     try {
-      await api.put(`/cart/${cartId}`, { quantity });
-      await fetchCart();
+      const response = await api.put(`/cart/${cartId}?expand=products`, { quantity });
+      applyCartSummary(response.data);
     } catch (error) {
       toast.error('Failed to update cart');
     }
@@ -76,8 +67,8 @@ export const CartProvider = ({ children }) => {
 
   const removeFromCart = async (cartId) => {
     try {
-      await api.delete(`/cart/${cartId}`);
-      await fetchCart();
+      const response = await api.delete(`/cart/${cartId}?expand=products`);
+      applyCartSummary(response.data);
       toast.success('Item removed from cart');
     } catch (error) {
       toast.error('Failed to remove item');
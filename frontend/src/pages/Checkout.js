@@ -15,6 +15,8 @@ const Checkout = () => {
   const [loading, setLoading] = useState(false);
   const [discountCode, setDiscountCode] = useState('');
   const [discount, setDiscount] = useState(0);
+  // The code the server accepted; the input may have changed since
+  const [appliedCode, setAppliedCode] = useState(null);
   const [addressData, setAddressData] = useState({
     full_name: user?.name || '',
     phone: '',
@@ -56,15 +58,27 @@ const Checkout = () => {
 
       if (response.data.valid) {
         setDiscount(response.data.discount);
+        setAppliedCode(discountCode);
         toast.success(response.data.message);
       } else {
+        setDiscount(0);
+        setAppliedCode(null);
         toast.error(response.data.message);
       }
     } catch (error) {
+      setDiscount(0);
+      setAppliedCode(null);
       toast.error('Invalid discount code');
     }
   };
 
+  const handleDiscountCodeChange = (e) => {
+    setDiscountCode(e.target.value);
+    // Editing the code withdraws the applied discount until it is applied again
+    setDiscount(0);
+    setAppliedCode(null);
+  };
+
   const handlePlaceOrder = async (e) => {
     e.preventDefault();
     setLoading(true);
@@ -86,6 +100,7 @@ const Checkout = () => {
         subtotal,
         discount,
         total,
+        discount_code: appliedCode,
         shipping_address: {
           id: '',
           user_id: user.id,
@@ -264,7 +279,7 @@ const Checkout = () => {
                     type="text"
                     placeholder="Discount code"
                     value={discountCode}
-                    onChange={(e) => setDiscountCode(e.target.value)}
+                    onChange={handleDiscountCodeChange}
                     className="bg-zinc-800/50 border-zinc-700 text-white focus:border-orange-500 rounded-2xl"
                     data-testid="discount-code-input"
                   />
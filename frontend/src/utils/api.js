@@ -1,4 +1,5 @@
 import axios from 'axios';
+import { getApiToken } from './shopifyAuth';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -7,8 +8,9 @@ const api = axios.create({
   baseURL: API,
 });
 
-api.interceptors.request.use((config) => {
-  const token = localStorage.getItem('token');
+api.interceptors.request.use(async (config) => {
+  // Customer Account login (session or Shopify access token), else legacy login
+  const token = (await getApiToken()) || localStorage.getItem('token');
   if (token) {
     config.headers.Authorization = `Bearer ${token}`;
   }
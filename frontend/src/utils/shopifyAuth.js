@@ -104,6 +104,10 @@ export async function handleOAuthCallback(code, state, codeVerifierFromCaller) {
       Date.now() + tokens.expires_in * 1000
     );
   }
+  // Only issued when the backend runs with LOCAL_SESSIONS=true
+  if (tokens.session_token) {
+    storeSessionToken(tokens.session_token, tokens.session_expires_in);
+  }
 
   // Clean up PKCE state
   sessionStorage.removeItem('oauth_state');
@@ -112,6 +116,65 @@ export async function handleOAuthCallback(code, state, codeVerifierFromCaller) {
   return tokens;
 }
 
+// Local session tokens: short-lived JWTs the backend verifies without calling
+// Shopify. They are renewed from the Shopify access token shortly before expiry.
+const SESSION_REFRESH_MARGIN_MS = 60 * 1000;
+let sessionRefresh = null;
+
+function storeSessionToken(sessionToken, expiresIn) {
+  sessionStorage.setItem('session_token', sessionToken);
+  sessionStorage.setItem('session_expires_at', Date.now() + expiresIn * 1000);
+}
+
+function clearSessionToken() {
+  sessionStorage.removeItem('session_token');
+  sessionStorage.removeItem('session_expires_at');
+}
+
+async function refreshSessionToken(accessToken) {
+  const response = await fetch('/api/auth/refresh', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ access_token: accessToken })
+  });
+  if (!response.ok) {
+    throw new Error('Failed to refresh session token');
+  }
+  const result = await response.json();
+  storeSessionToken(result.session_token, result.session_expires_in);
+  return result.session_token;
+}
+
+// Bearer token for backend API calls: the local session token when there is
+// one, otherwise the Shopify access token
+export async function getApiToken() {
+  const accessToken = sessionStorage.getItem('access_token');
+  const sessionToken = sessionStorage.getItem('session_token');
+  if (!sessionToken) return accessToken;
+
+  const expiresAt = parseInt(sessionStorage.getItem('session_expires_at'), 10) || 0;
+  if (Date.now() < expiresAt - SESSION_REFRESH_MARGIN_MS) return sessionToken;
+  if (!accessToken) {
+    clearSessionToken();
+    return null;
+  }
+
+  // Concurrent requests share one refresh
+  if (!sessionRefresh) {
+    sessionRefresh = refreshSessionToken(accessToken).finally(() => {
+      sessionRefresh = null;
+    });
+  }
+  try {
+    return await sessionRefresh;
+  } catch (error) {
+    // Sessions disabled or refresh failed: fall back to the Shopify token
+    console.error('Error refreshing session token:', error);
+    clearSessionToken();
+    return accessToken;
+  }
+}
+
 // Get customer data from Customer Account API
 export async function getCustomerFromShopify() {
   const accessToken = sessionStorage.getItem('access_token');
@@ -162,6 +225,7 @@ export function logoutShopify() {
   sessionStorage.removeItem('refresh_token');
   sessionStorage.removeItem('id_token');
   sessionStorage.removeItem('token_expires_at');
+  clearSessionToken();
   window.location.href = SHOPIFY_AUTH_CONFIG.logoutEndpoint;
 }
 
@@ -0,0 +1,26 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+# server.py reads its configuration at import time; no database is contacted
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "fitgear_test")
+os.environ["JWT_SECRET"] = "test-secret-" + "0123456789" * 4
+os.environ["LOCAL_SESSIONS"] = "true"
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Swap the app's database for an in-memory mongomock one"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import product_import
+    import server
+
+    mock_db = mongomock_motor.AsyncMongoMockClient()["fitgear_test"]
+    monkeypatch.setattr(server, "db", mock_db)
+    monkeypatch.setattr(product_import, "db", mock_db)
+    return mock_db
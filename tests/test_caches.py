@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+import server
+from server import CustomerCache, SingleFlight
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(server.time, "monotonic", clock)
+    return clock
+
+
+def customer(n: int) -> dict:
+    return {"id": f"gid://shopify/Customer/{n}", "displayName": f"User {n}"}
+
+
+def test_customer_cache_hit_until_ttl(clock):
+    cache = CustomerCache(max_size=10, ttl=60, negative_ttl=5)
+    cache.set("token-1", customer(1))
+
+    assert cache.get("token-1") == (True, customer(1))
+    clock.now += 59
+    assert cache.get("token-1") == (True, customer(1))
+    clock.now += 1
+    assert cache.get("token-1") == (False, None)
+    assert cache.stats()["size"] == 0
+
+
+def test_customer_cache_ttl_capped_by_token_expiry(clock):
+    cache = CustomerCache(max_size=10, ttl=60, negative_ttl=5)
+    cache.set("token-1", customer(1), expires_in=10)
+
+    clock.now += 10
+    assert cache.get("token-1") == (False, None)
+
+
+def test_customer_cache_negative_entries(clock):
+    cache = CustomerCache(max_size=10, ttl=60, negative_ttl=5)
+    cache.set("bad-token", None)
+
+    # Found, but cached as invalid
+    assert cache.get("bad-token") == (True, None)
+    clock.now += 5
+    assert cache.get("bad-token") == (False, None)
+
+
+def test_customer_cache_evicts_least_recently_used(clock):
+    cache = CustomerCache(max_size=2, ttl=60, negative_ttl=5)
+    cache.set("token-1", customer(1))
+    cache.set("token-2", customer(2))
+    cache.get("token-1")
+    cache.set("token-3", customer(3))
+
+    assert cache.get("token-2") == (False, None)
+    assert cache.get("token-1") == (True, customer(1))
+    assert cache.get("token-3") == (True, customer(3))
+
+
+def test_customer_cache_disabled_by_zero_size(clock):
+    cache = CustomerCache(max_size=0, ttl=60, negative_ttl=5)
+    cache.set("token-1", customer(1))
+
+    assert cache.get("token-1") == (False, None)
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", load) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["value"] * 5
+    assert len(calls) == 1
+    assert flight.shared == 4
+
+
+def test_single_flight_runs_again_after_completion():
+    flight = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        return [await flight.do("key", load), await flight.do("key", load)]
+
+    assert asyncio.run(run()) == [1, 2]
+
+
+def test_single_flight_shares_errors_and_forgets_the_call():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def run():
+        return await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight._calls == {}
+
+
+def test_single_flight_survives_a_cancelled_waiter():
+    flight = SingleFlight()
+
+    async def load():
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("key", load))
+        second = asyncio.ensure_future(flight.do("key", load))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "value"
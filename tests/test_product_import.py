@@ -0,0 +1,87 @@
+import asyncio
+
+from product_import import import_products, read_rows, rows_in_threadpool
+
+EXISTING = {
+    "id": "p1", "name": "Old Name", "description": "Keep me", "price": 10.0, "category": "Gym Equipment",
+    "brand": "PowerFit", "images": ["a.jpg"], "stock": 7, "rating": 4.5, "rating_sum": 9.0, "review_count": 2,
+    "created_at": "2024-01-01T00:00:00+00:00",
+}
+
+
+def run_import(db, lines, fmt="csv", **kwargs):
+    async def run():
+        await db.products.insert_one(dict(EXISTING))
+        report = await import_products(rows_in_threadpool(read_rows(lines, fmt)), **kwargs)
+        products = {p["id"]: p for p in await db.products.find({}, {"_id": 0}).to_list(None)}
+        return report, products
+
+    return asyncio.run(run())
+
+
+def test_partial_row_updates_only_given_columns(db):
+    lines = ["id,name,price,category,brand\n", "p1,New Name,12.5,Gym Equipment,PowerFit\n"]
+    report, products = run_import(db, lines)
+
+    assert report == {"processed": 1, "inserted": 0, "updated": 1, "failed": 0, "errors": []}
+    product = products["p1"]
+    assert product["name"] == "New Name"
+    assert product["price"] == 12.5
+    # Columns missing from the row keep their stored values
+    assert product["description"] == "Keep me"
+    assert product["images"] == ["a.jpg"]
+    assert product["stock"] == 7
+    assert product["rating"] == 4.5
+    assert product["review_count"] == 2
+    assert "new" in product["search_keywords"]
+
+
+def test_empty_cells_do_not_clear_stored_values(db):
+    lines = ["id,name,description,price,category,brand,stock\n", "p1,Old Name,,10,Gym Equipment,PowerFit,\n"]
+    _, products = run_import(db, lines)
+
+    assert products["p1"]["description"] == "Keep me"
+    assert products["p1"]["stock"] == 7
+
+
+def test_new_product_gets_defaults(db):
+    lines = ['{"id": "p2", "name": "Yoga Mat", "price": 20, "category": "Accessories", "brand": "ZenFit"}\n']
+    report, products = run_import(db, lines, fmt="ndjson")
+
+    assert report["inserted"] == 1
+    product = products["p2"]
+    assert product["description"] == ""
+    assert product["images"] == []
+    assert product["stock"] == 0
+    assert product["rating"] == 0.0
+    assert product["review_count"] == 0
+    assert product["created_at"]
+
+
+def test_invalid_rows_are_reported_and_skipped(db):
+    lines = [
+        "id,name,price,category,brand\n",
+        "p1,Renamed,abc,Gym Equipment,PowerFit\n",
+        "p3,Bands,15,Accessories,FlexBand\n",
+        ",No Brand,15,Accessories\n",
+    ]
+    report, products = run_import(db, lines, chunk_size=1)
+
+    assert report["processed"] == 3
+    assert report["inserted"] == 1
+    assert report["failed"] == 2
+    assert [e["row"] for e in report["errors"]] == [2, 4]
+    assert products["p1"]["name"] == "Old Name"
+    assert "p3" in products
+
+
+def test_on_chunk_receives_written_ids(db):
+    written = []
+
+    async def on_chunk(ids):
+        written.append(ids)
+
+    lines = ["id,name,price,category,brand\n"] + [f"n{i},Item {i},1,Misc,Brand\n" for i in range(5)]
+    run_import(db, lines, chunk_size=2, on_chunk=on_chunk)
+
+    assert written == [["n0", "n1"], ["n2", "n3"], ["n4"]]
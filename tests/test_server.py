@@ -0,0 +1,107 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import server
+from server import decode_cursor, encode_cursor, keyset_filter
+
+USER = {"id": "gid://shopify/Customer/1", "email": "a@example.com", "name": "A B", "firstName": "A", "lastName": "B"}
+
+
+@pytest.mark.parametrize("sort", ["created_at", "-created_at", "price", "-price", "rating", "-rating"])
+def test_cursor_pages_cover_every_document_once(db, sort):
+    # Repeated sort values exercise the id tie-break
+    docs = [{"id": f"p{i:02d}", "created_at": f"2024-01-{i % 5 + 1:02d}", "price": float(i % 4), "rating": i % 3}
+            for i in range(23)]
+    field, direction = server.PRODUCT_SORTS[sort]
+
+    async def walk():
+        await db.products.insert_many([dict(d) for d in docs])
+        seen, cursor = [], None
+        while True:
+            query = keyset_filter(field, direction, decode_cursor(cursor, sort)) if cursor else {}
+            page = await db.products.find(query, {"_id": 0}).sort([(field, direction), ("id", direction)]).to_list(5)
+            if not page:
+                return seen
+            seen += [p["id"] for p in page]
+            cursor = encode_cursor(sort, field, page[-1])
+
+    expected = sorted(docs, key=lambda d: (d[field], d["id"]), reverse=direction == -1)
+    assert asyncio.run(walk()) == [d["id"] for d in expected]
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("-price", "price", {"id": "p1", "price": 9.5})
+    assert decode_cursor(cursor, "-price") == {"s": "-price", "v": 9.5, "id": "p1"}
+
+
+def test_cursor_rejects_other_sort_and_garbage():
+    cursor = encode_cursor("price", "price", {"id": "p1", "price": 9.5})
+    with pytest.raises(HTTPException) as e:
+        decode_cursor(cursor, "-price")
+    assert e.value.status_code == 400
+    with pytest.raises(HTTPException) as e:
+        decode_cursor("not-a-cursor!", "price")
+    assert e.value.status_code == 400
+
+
+def test_add_to_cart_upserts_one_line_per_product(db):
+    async def run():
+        await db.cart.create_index([("user_id", 1), ("product_id", 1)], unique=True)
+        first = await server.add_to_cart(server.CartItemCreate(product_id="p1", quantity=2), None, USER)
+        second = await server.add_to_cart(server.CartItemCreate(product_id="p1", quantity=3), None, USER)
+        other = await server.add_to_cart(server.CartItemCreate(product_id="p2", quantity=1), None, USER)
+        lines = await db.cart.find({"user_id": USER["id"]}, {"_id": 0}).to_list(10)
+        return first, second, other, lines
+
+    first, second, other, lines = asyncio.run(run())
+    assert first.quantity == 2
+    assert second.quantity == 5
+    assert second.id == first.id
+    assert other.id != first.id
+    assert sorted((line["product_id"], line["quantity"]) for line in lines) == [("p1", 5), ("p2", 1)]
+
+
+def session_claims(**overrides) -> dict:
+    claims = {
+        "sub": USER["id"], "email": USER["email"], "name": USER["name"], "typ": server.SESSION_TOKEN_TYPE,
+        "exp": datetime.now(timezone.utc) + timedelta(minutes=5),
+    }
+    return {**claims, **overrides}
+
+
+def get_me(token: str):
+    return TestClient(server.app).get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+
+def test_session_token_accepted():
+    assert server.LOCAL_SESSIONS
+    token, _ = server.create_session_token(USER)
+    response = get_me(token)
+    assert response.status_code == 200
+    assert response.json()["id"] == USER["id"]
+
+
+@pytest.mark.parametrize("secret", ["fitgear_jwt_secret_key_default_dev", "some-other-secret-" + "x" * 32])
+def test_session_token_with_wrong_secret_rejected(secret):
+    token = jwt.encode(session_claims(), secret, algorithm=server.ALGORITHM)
+    assert get_me(token).status_code == 401
+
+
+@pytest.mark.parametrize("typ", [None, "access", "refresh"])
+def test_session_token_with_wrong_type_rejected(typ):
+    claims = session_claims(typ=typ)
+    if typ is None:
+        del claims["typ"]
+    token = jwt.encode(claims, server.SECRET_KEY, algorithm=server.ALGORITHM)
+    assert get_me(token).status_code == 401
+
+
+def test_expired_session_token_rejected():
+    token = jwt.encode(session_claims(exp=datetime.now(timezone.utc) - timedelta(seconds=1)),
+                       server.SECRET_KEY, algorithm=server.ALGORITHM)
+    assert get_me(token).status_code == 401